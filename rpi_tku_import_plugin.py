@@ -7,13 +7,35 @@ This plugin imports RPi TKu telemetry data files (.dat) with:
 - Intelligent dataset organization
 - Proper tagging (Voltages, Amperages, StateValues)
 - Both original and converted timestamps
+- Batch import of a directory/glob of rolling files, merged on time
+- Follow mode for growing files (only appended rows are parsed on reload)
+- Decimated companion datasets (min/max envelope, LTTB) for huge channels
+- Single pass, chunk-mergeable statistics exported as a summary table
+- Column projection by name, tag category or regex
+- Configurable column categorization rules (JSON rule file)
+- Time window import that bisects the file instead of parsing all of it
+- Persistent sidecar line-offset index for random access into long runs
+- Run-length transition tables for state channels (optionally replacing
+  the full arrays)
+- Derived power and energy channels from matched voltage/current pairs
+- Timestamp gap detection and uniform-grid resampling
+- Instant preview from bounded head/tail reads (no full file scan)
 
 Created by: William W. Wallace
 Version: 1.11 (Refined Requirements)
 """
 
 import os
+import re
+import sys
+import glob
+import types
+import warnings
+import json
+import zlib
+import fnmatch
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 
 # Import the necessary Veusz plugin components
@@ -26,6 +48,524 @@ from veusz.plugins import (
     field, ImportDataset1D, ImportDatasetText
 )
 
+# Relative time column every telemetry file is ordered on
+TIME_COLUMN = 'UTC Now minus UTC Trigger'
+
+# Module name batch worker processes import this plugin file under. Veusz
+# exec()s plugin files, so otherwise nothing here could be pickled to them
+_WORKER_MODULE = 'rpi_tku_import_plugin_worker'
+
+# Run (via exec) in each worker process to import this plugin file
+_WORKER_LOADER = (
+    "import importlib.util, sys\n"
+    "spec = importlib.util.spec_from_file_location({name!r}, {path!r})\n"
+    "module = importlib.util.module_from_spec(spec)\n"
+    "sys.modules[{name!r}] = module\n"
+    "spec.loader.exec_module(module)\n"
+)
+
+# Encodings tried, in order, when reading a telemetry file
+FILE_ENCODINGS = ('utf-8', 'cp1252', 'latin-1')
+
+# Decimation methods offered for companion datasets
+DECIMATION_METHODS = ('Min/Max envelope', 'LTTB', 'Both')
+
+# Built-in column categorization rules. A rule file (JSON) may replace
+# them: {"rules": [{"regex" or "glob": ..., "tags": [...], "unit": ...},
+# ...]}. Patterns must match the whole column name. Other keys (such as
+# an old "dtype") are ignored: Veusz stores every dataset as float64.
+DEFAULT_COLUMN_RULES = (
+    {'regex': r'.*V', 'tags': ['Voltages'], 'unit': 'V'},
+    {'regex': r'(?!Det).*A', 'tags': ['Amperages'], 'unit': 'A'},
+    {'glob': 'Det*', 'tags': ['StateValues']},
+    {'regex': r'Lock|MIMIC State|LOCKED', 'tags': ['StateValues']},
+    {'regex': r'(?i:.*(?:time|utc).*)', 'tags': ['DateTime']},
+)
+
+# Compiled rule tables for the session, keyed by (rule file, mtime)
+_COLUMN_RULES = {}
+
+# Accepted formats for absolute UTC time window limits
+UTC_TIME_FORMATS = ('%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%d %H:%M:%S',
+                    '%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S',
+                    '%Y-%m-%d %H:%M')
+
+# Time window bisection stops once the bracket is this many bytes wide
+BISECT_MIN_SPAN = 1 << 16
+
+# Sidecar line-offset index: one entry every LINE_INDEX_STRIDE data lines,
+# the file is scanned in LINE_INDEX_BLOCK byte blocks
+LINE_INDEX_STRIDE = 1024
+LINE_INDEX_BLOCK = 1 << 24
+LINE_INDEX_SUFFIX = '.idx.npz'
+# Bumped when the sidecar contents change meaning; older sidecars are rebuilt
+LINE_INDEX_VERSION = 2
+
+# Line-offset indexes loaded this session, keyed by file path
+_LINE_INDEXES = {}
+
+# Bytes sampled from the start and end of the data for the preview
+PREVIEW_SAMPLE_BYTES = 1 << 16
+
+# Values per statistics chunk (small enough to stay cache resident)
+STATISTICS_CHUNK = 1 << 16
+
+# Percentiles estimated by the streaming sketch
+STATISTICS_PERCENTILES = (5, 25, 50, 75, 95)
+
+# Storage options for low-cardinality state channels
+STATE_STORAGE_MODES = ('Full', 'Full + transitions', 'Transitions only')
+
+# Most distinct levels for a column to be treated as a state channel
+STATE_MAX_LEVELS = 16
+
+# Follow mode state per file, kept for the whole Veusz session because
+# Veusz creates a new plugin instance for every (re)import
+_FOLLOW_STATE = {}
+
+
+def _tokens_to_float(tokens):
+    """Convert a list of text tokens to a float array (bad tokens -> NaN)."""
+    try:
+        return np.array(tokens, dtype=np.float64)
+    except ValueError:
+        values = np.empty(len(tokens))
+        for i, token in enumerate(tokens):
+            try:
+                values[i] = float(token)
+            except ValueError:
+                values[i] = np.nan
+        return values
+
+
+class ColumnStatistics:
+    """
+    Mergeable running statistics of one column.
+
+    Count, NaN count, min, max, mean and M2 are combined across chunks with
+    the Welford/Chan parallel update, so a column is read once and chunks
+    (or follow mode refreshes) can be folded in as they arrive. Percentiles
+    come from an optional weighted quantile sketch that keeps at most
+    sketch_size points per chunk.
+    """
+
+    def __init__(self, percentiles=False, sketch_size=256):
+        self.count = 0
+        self.nan_count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.sketch_size = sketch_size
+        self.sketch = ([], []) if percentiles else None
+
+    def update(self, values):
+        """Fold an array of values in, chunk by chunk."""
+        for start in range(0, len(values), STATISTICS_CHUNK):
+            self.update_chunk(values[start:start + STATISTICS_CHUNK])
+
+    def update_chunk(self, chunk):
+        """Fold one cache-sized chunk in."""
+        valid = chunk[~np.isnan(chunk)]
+        self.nan_count += len(chunk) - len(valid)
+        n = len(valid)
+        if n == 0:
+            return
+
+        mean = valid.mean()
+        centred = valid - mean
+        self.combine(n, mean, float(np.dot(centred, centred)),
+                     valid.min(), valid.max())
+
+        if self.sketch is not None:
+            nsketch = min(n, self.sketch_size)
+            self.sketch[0].append(
+                np.quantile(valid, (np.arange(nsketch) + 0.5) / nsketch))
+            self.sketch[1].append(np.full(nsketch, n / nsketch))
+            self.compact_sketch()
+
+    def combine(self, n, mean, m2, vmin, vmax):
+        """Chan et al. combination with a partial result."""
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.count * n / total
+        self.count = total
+        self.min = min(self.min, float(vmin))
+        self.max = max(self.max, float(vmax))
+
+    def merge(self, other):
+        """Merge another ColumnStatistics into this one."""
+        self.nan_count += other.nan_count
+        if other.count:
+            self.combine(other.count, other.mean, other.m2,
+                         other.min, other.max)
+        if self.sketch is not None and other.sketch is not None:
+            self.sketch[0].extend(other.sketch[0])
+            self.sketch[1].extend(other.sketch[1])
+            self.compact_sketch()
+
+    def sketch_cdf(self):
+        """
+        Sorted sketch values, their cumulative weight positions and the
+        total weight.
+        """
+        values = np.concatenate(self.sketch[0])
+        weights = np.concatenate(self.sketch[1])
+        order = np.argsort(values)
+        weights = weights[order]
+        cumulative = np.cumsum(weights)
+        total = cumulative[-1]
+        cumulative -= 0.5 * weights
+        return values[order], cumulative, total
+
+    def compact_sketch(self):
+        """Resample the sketch once it holds too many points."""
+        if sum(len(v) for v in self.sketch[0]) <= 16 * self.sketch_size:
+            return
+        values, cumulative, total = self.sketch_cdf()
+        nsketch = 4 * self.sketch_size
+        targets = (np.arange(nsketch) + 0.5) / nsketch * total
+        self.sketch = ([np.interp(targets, cumulative, values)],
+                       [np.full(nsketch, total / nsketch)])
+
+    def percentiles(self, percents):
+        """Estimate percentiles from the sketch."""
+        values, cumulative, total = self.sketch_cdf()
+        return np.interp(np.asarray(percents) / 100.0 * total,
+                         cumulative, values)
+
+    def result(self):
+        """Statistics dict, or None if there were no valid values."""
+        if self.count == 0:
+            return None
+        result = {
+            'valid_count': self.count,
+            'nan_count': self.nan_count,
+            'min': self.min,
+            'max': self.max,
+            'mean': float(self.mean),
+            'std': float(np.sqrt(self.m2 / self.count)),
+        }
+        if self.sketch is not None:
+            for percent, value in zip(
+                    STATISTICS_PERCENTILES,
+                    self.percentiles(STATISTICS_PERCENTILES)):
+                result[f'p{percent}'] = float(value)
+        return result
+
+
+class ColumnRules:
+    """
+    Compiled column categorization rules.
+
+    All rule patterns are combined into one regular expression made of
+    optional lookaheads, one named group per rule, so a single match finds
+    every rule a column name satisfies. Results are memoized per column
+    name and per column-name set.
+    """
+
+    def __init__(self, rules):
+        self.rules = []
+        alternatives = []
+        for rule_idx, rule in enumerate(rules):
+            if 'glob' in rule:
+                pattern = fnmatch.translate(rule['glob'])
+            elif 'regex' in rule:
+                pattern = f"(?:{rule['regex']})\\Z"
+            else:
+                raise ImportPluginException(
+                    f"Column rule {rule_idx} needs a 'regex' or 'glob'")
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                raise ImportPluginException(
+                    f"Invalid pattern in column rule {rule_idx}: {e}")
+
+            self.rules.append({
+                'tags': list(rule.get('tags', [])),
+                'unit': rule.get('unit'),
+            })
+            alternatives.append(f"(?:(?=(?P<r{rule_idx}>{pattern}))|)")
+
+        self.matcher = re.compile(''.join(alternatives))
+        self.columns = {}
+        self.column_sets = {}
+
+    def classify(self, col_name):
+        """Return {'tags', 'unit'} for a column name."""
+        result = self.columns.get(col_name)
+        if result is not None:
+            return result
+
+        result = {'tags': [], 'unit': None}
+        groups = self.matcher.match(col_name).groupdict()
+        for rule_idx, rule in enumerate(self.rules):
+            if groups[f'r{rule_idx}'] is None:
+                continue
+            for tag in rule['tags']:
+                if tag not in result['tags']:
+                    result['tags'].append(tag)
+            if result['unit'] is None:
+                result['unit'] = rule['unit']
+
+        self.columns[col_name] = result
+        return result
+
+    def classify_all(self, column_names):
+        """Classify a set of column names (memoized per name set)."""
+        key = tuple(column_names)
+        results = self.column_sets.get(key)
+        if results is None:
+            results = [self.classify(c) for c in column_names]
+            self.column_sets[key] = results
+        return results
+
+
+def load_column_rules(filename=''):
+    """
+    Load (once per session) the column rules from a JSON rule file.
+
+    A blank filename gives the built-in rules. A rule file is reloaded
+    when its modification time changes.
+    """
+    if not filename:
+        key = ('', None)
+    else:
+        try:
+            key = (os.path.abspath(filename), os.path.getmtime(filename))
+        except OSError:
+            raise ImportPluginException(
+                f"Column rule file not found: {filename}")
+
+    rules = _COLUMN_RULES.get(key)
+    if rules is not None:
+        return rules
+
+    if not filename:
+        rules = ColumnRules(DEFAULT_COLUMN_RULES)
+    else:
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ImportPluginException(
+                f"Could not read column rule file {filename}: {e}")
+        if isinstance(config, dict):
+            config = config.get('rules', [])
+        rules = ColumnRules(config)
+
+    _COLUMN_RULES[key] = rules
+    return rules
+
+
+class TelemetryLineIndex:
+    """
+    Sparse line-offset index of a telemetry file.
+
+    Records the byte offset and time of every LINE_INDEX_STRIDE-th data
+    line so any time can be located with a binary search and a seek.
+    Comment ('%') and blank lines are not counted, and data lines without
+    a parseable time are left out, so the indexed times stay searchable
+    with np.searchsorted. The index is saved next to the data file
+    (<file>.idx.npz). When the file grows the index is extended from
+    where it stopped. It is rebuilt when the header, layout or indexed
+    content no longer matches.
+    """
+
+    def __init__(self, filename, data_offset, header_bytes, time_pos):
+        self.filename = filename
+        self.data_offset = data_offset
+        self.header_crc = zlib.crc32(header_bytes)
+        self.time_pos = time_pos
+        self.stride = LINE_INDEX_STRIDE
+        self.offsets = np.empty(0, dtype=np.int64)
+        self.times = np.empty(0)
+        self.rows = 0
+        self.end_offset = data_offset
+        self.size = -1
+        self.mtime = -1.0
+
+    @property
+    def sidecar(self):
+        """Path of the sidecar index file."""
+        return self.filename + LINE_INDEX_SUFFIX
+
+    @classmethod
+    def open(cls, filename, f, data_offset, header_bytes, time_pos,
+             update=True):
+        """
+        Return the up to date index of a file.
+
+        f is the open (binary) data file. With update False no scanning
+        is done and None is returned unless a current index exists.
+        """
+        key = os.path.abspath(filename)
+        stat = os.stat(filename)
+
+        index = _LINE_INDEXES.get(key)
+        if index is None:
+            index = cls.load(key)
+        if (index is None
+                or index.header_crc != zlib.crc32(header_bytes)
+                or index.data_offset != data_offset
+                or index.time_pos != time_pos
+                or index.stride != LINE_INDEX_STRIDE):
+            index = cls(key, data_offset, header_bytes, time_pos)
+
+        if (index.size, index.mtime) == (stat.st_size, stat.st_mtime):
+            _LINE_INDEXES[key] = index
+            return index
+        if not update:
+            return None
+
+        if not index.prefix_valid(f, stat.st_size):
+            index = cls(key, data_offset, header_bytes, time_pos)
+        index.scan(f)
+        index.size = stat.st_size
+        index.mtime = stat.st_mtime
+        index.save()
+        _LINE_INDEXES[key] = index
+        return index
+
+    @classmethod
+    def load(cls, filename):
+        """Load a sidecar index, or None if missing or unreadable."""
+        try:
+            with np.load(filename + LINE_INDEX_SUFFIX) as stored:
+                if int(stored['version']) != LINE_INDEX_VERSION:
+                    return None
+                index = cls.__new__(cls)
+                index.filename = filename
+                for name in ('data_offset', 'header_crc', 'time_pos',
+                             'stride', 'rows', 'end_offset', 'size'):
+                    setattr(index, name, int(stored[name]))
+                index.mtime = float(stored['mtime'])
+                index.offsets = stored['offsets']
+                index.times = stored['times']
+                return index
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def save(self):
+        """Write the sidecar file (silently skipped if not writable)."""
+        try:
+            with open(self.sidecar, 'wb') as f:
+                np.savez(f, version=LINE_INDEX_VERSION,
+                         data_offset=self.data_offset,
+                         header_crc=self.header_crc, time_pos=self.time_pos,
+                         stride=self.stride, rows=self.rows,
+                         end_offset=self.end_offset, size=self.size,
+                         mtime=self.mtime, offsets=self.offsets,
+                         times=self.times)
+        except OSError:
+            pass
+
+    def line_time(self, line):
+        """Time value of a raw data line (NaN if unparseable)."""
+        try:
+            return float(line.split()[self.time_pos])
+        except (ValueError, IndexError):
+            return np.nan
+
+    def prefix_valid(self, f, size):
+        """Whether the indexed part of the file is unchanged."""
+        if size < self.end_offset:
+            return False
+        if len(self.offsets) == 0:
+            return True
+        f.seek(int(self.offsets[-1]))
+        time = self.line_time(f.readline())
+        return time == self.times[-1] or (
+            np.isnan(time) and np.isnan(self.times[-1]))
+
+    def scan(self, f):
+        """Index the complete lines after end_offset."""
+        f.seek(self.end_offset)
+        position = self.end_offset
+        carry = b''
+        offsets = [self.offsets]
+        times = [self.times]
+
+        while True:
+            block = f.read(LINE_INDEX_BLOCK)
+            if not block:
+                break
+            buffer = carry + block
+            buffer_offset = position - len(carry)
+            position += len(block)
+
+            newlines = np.flatnonzero(
+                np.frombuffer(buffer, dtype=np.uint8) == ord('\n'))
+            if len(newlines) == 0:
+                carry = buffer
+                continue
+
+            starts = np.concatenate([[0], newlines[:-1] + 1])
+
+            # Data lines only: not empty (or a lone '\r') and not '%'
+            first = np.frombuffer(buffer, dtype=np.uint8)[starts]
+            lengths = newlines - starts
+            is_data = ((lengths > 0) & (first != ord('%'))
+                       & ~((lengths == 1) & (first == ord('\r'))))
+            starts = starts[is_data]
+            ends = newlines[is_data]
+
+            picked = np.arange((-self.rows) % self.stride,
+                               len(starts), self.stride)
+            picked_times = np.array(
+                [self.line_time(buffer[starts[i]:ends[i]]) for i in picked],
+                dtype=np.float64)
+            timed = ~np.isnan(picked_times)
+            offsets.append(starts[picked[timed]] + buffer_offset)
+            times.append(picked_times[timed])
+
+            self.rows += len(starts)
+            carry = buffer[newlines[-1] + 1:]
+
+        self.end_offset = position - len(carry)
+        self.offsets = np.concatenate(offsets).astype(np.int64)
+        self.times = np.concatenate(times)
+
+    def bracket(self, t, before_inclusive=False):
+        """
+        Byte bracket (lo, hi) around the first line at time t.
+
+        Lines starting before lo are earlier than t, a line at or after t
+        starts at or before hi (None = end of file). With before_inclusive
+        lines at exactly t count as earlier.
+        """
+        side = 'right' if before_inclusive else 'left'
+        i = int(np.searchsorted(self.times, t, side=side))
+        lo = int(self.offsets[i - 1]) + 1 if i > 0 else self.data_offset
+        hi = int(self.offsets[i]) if i < len(self.offsets) else None
+        return lo, hi
+
+
+def _read_telemetry_file(filename, selection='', rules_file=''):
+    """
+    Read one telemetry file.
+
+    Module level so that batch imports can hand it to worker processes.
+    """
+    plugin = RPiTKuImportPluginEnhanced()
+    plugin.column_rules = load_column_rules(rules_file)
+    return plugin.read_file(filename, selection=selection, strict=False)
+
+
+# Path of this plugin file; taken from the code object as Veusz does not
+# necessarily set __file__ when it exec()s plugins
+_PLUGIN_PATH = _read_telemetry_file.__code__.co_filename
+
+if __name__ != _WORKER_MODULE:
+    # Make _read_telemetry_file picklable by reference from this process;
+    # workers import the real file under the same name (_WORKER_LOADER)
+    _read_telemetry_file.__module__ = _WORKER_MODULE
+    _worker_alias = types.ModuleType(_WORKER_MODULE)
+    _worker_alias.__file__ = _PLUGIN_PATH
+    _worker_alias._read_telemetry_file = _read_telemetry_file
+    sys.modules[_WORKER_MODULE] = _worker_alias
+
 
 class RPiTKuImportPluginEnhanced(ImportPlugin):
     """
@@ -56,7 +596,101 @@ class RPiTKuImportPluginEnhanced(ImportPlugin):
                 descr='Calculate and store statistics (min, max, mean) for numeric datasets',
                 default=True
             ),
+            field.FieldBool(
+                'statistics_percentiles',
+                descr='Also estimate percentiles (P5-P95) with a streaming sketch',
+                default=False
+            ),
+            field.FieldText(
+                'columns',
+                descr='Columns to import: names, tags (Voltages, Amperages, '
+                      'StateValues) or re:<regex>, comma separated (blank = all)',
+                default=''
+            ),
+            field.FieldText(
+                'time_start',
+                descr='Time window start: seconds after trigger or UTC '
+                      '"YYYY-MM-DD HH:MM:SS" (blank = start of file)',
+                default=''
+            ),
+            field.FieldText(
+                'time_stop',
+                descr='Time window stop: seconds after trigger or UTC '
+                      '"YYYY-MM-DD HH:MM:SS" (blank = end of file)',
+                default=''
+            ),
+            field.FieldBool(
+                'line_index',
+                descr='Keep a sidecar line-offset index (<file>.idx.npz) '
+                      'for fast time window imports and previews',
+                default=False
+            ),
+            field.FieldFilename(
+                'rules_file',
+                descr='Column categorization rule file (JSON, blank = built-in)',
+                default=''
+            ),
+            field.FieldText(
+                'batch_pattern',
+                descr='Batch import: directory or glob of .dat files to merge '
+                      '(relative to this file, blank = this file only)',
+                default=''
+            ),
+            field.FieldInt(
+                'batch_workers',
+                descr='Batch import: worker processes (0 = one per CPU)',
+                default=0,
+                minval=0
+            ),
+            field.FieldBool(
+                'follow_mode',
+                descr='Follow growing file: on reload only parse rows appended '
+                      'since the last import (single file only)',
+                default=False
+            ),
+            field.FieldText(
+                'decimation_sizes',
+                descr='Decimated companion datasets: target sizes, comma '
+                      'separated (blank = none)',
+                default=''
+            ),
+            field.FieldCombo(
+                'decimation_method',
+                descr='Decimation method for companion datasets',
+                default='Both',
+                items=DECIMATION_METHODS,
+                editable=False
+            ),
+            field.FieldBool(
+                'derive_power',
+                descr='Derive power (V x A) and cumulative energy datasets '
+                      'from matching ...V / ...A column pairs',
+                default=False
+            ),
+            field.FieldFloat(
+                'gap_factor',
+                descr='Gap detection: flag time steps longer than this many '
+                      'median sample periods (0 = off)',
+                default=0.0,
+                minval=0.0
+            ),
+            field.FieldBool(
+                'resample_uniform',
+                descr='Resample all channels onto a uniform grid at the '
+                      'median sample period (NaN inside detected gaps)',
+                default=False
+            ),
+            field.FieldCombo(
+                'state_storage',
+                descr='State channels: keep full arrays, add a transitions '
+                      'table, or keep only the run-length transitions (the '
+                      'only mode that saves memory)',
+                default='Full',
+                items=STATE_STORAGE_MODES,
+                editable=False
+            ),
         ]
+        self.column_rules = load_column_rules()
 
     def mjd_to_datetime(self, mjd_seconds, base_mjd_timestamp):
         """Convert MJD seconds offset to datetime string."""
@@ -111,46 +745,1247 @@ class RPiTKuImportPluginEnhanced(ImportPlugin):
 
     def categorize_column(self, col_name):
         """Determine category and tags for a column."""
-        tags = []
-        
-        # Voltage detection
-        if col_name.endswith('V'):
-            tags.append('Voltages')
-        
-        # Amperage detection (exclude detector names)
-        if col_name.endswith('A') and not col_name.startswith('Det'):
-            tags.append('Amperages')
-        
-        # State values (detector states, lock status, etc)
-        if col_name.startswith('Det'):
-            tags.append('StateValues')
-        
-        if col_name in ['Lock', 'MIMIC State', 'LOCKED']:
-            if 'StateValues' not in tags:
-                tags.append('StateValues')
-        
-        # DateTime detection
-        if 'time' in col_name.lower() or 'utc' in col_name.lower():
-            tags.append('DateTime')
-        
-        return tags
+        return list(self.column_rules.classify(col_name)['tags'])
 
-    def calculate_statistics(self, data_array):
+    def calculate_statistics(self, data_array, percentiles=False):
         """Calculate statistical measures for a numeric dataset."""
-        valid_data = data_array[~np.isnan(data_array)]
-        
-        if len(valid_data) == 0:
+        stats = ColumnStatistics(percentiles=percentiles)
+        stats.update(data_array)
+        return stats.result()
+
+    def decode_line(self, raw_line):
+        """Decode one raw header line, trying each supported encoding."""
+        for enc in FILE_ENCODINGS:
+            try:
+                return raw_line.decode(enc)
+            except UnicodeDecodeError:
+                continue
+        return raw_line.decode('latin-1', errors='replace')
+
+    def split_header(self, raw):
+        """
+        Split raw file bytes into header and data.
+
+        Returns the parsed header (see parse_header) and the byte offset of
+        the first data line.
+        """
+        header_lines = []
+        data_offset = 0
+        for raw_line in raw.splitlines(keepends=True):
+            line = self.decode_line(raw_line)
+            stripped = line.rstrip('\r\n')
+            if stripped and not stripped.startswith('%'):
+                break
+            header_lines.append(line)
+            data_offset += len(raw_line)
+
+        header_list, column_names, _, base_mjd_timestamp = \
+            self.parse_header(header_lines)
+        return header_list, column_names, base_mjd_timestamp, data_offset
+
+    def parse_data_block(self, lines, ncols, col_indices=None):
+        """
+        Parse data lines into a (len(col_indices), nrows) float array.
+
+        Only the columns in col_indices (default all ncols) are converted.
+        Rows with missing values are NaN-filled, unparseable values become NaN.
+        """
+        if col_indices is None:
+            col_indices = range(ncols)
+
+        rows = []
+        for line in lines:
+            line = line.rstrip('\r\n')
+            if line and not line.startswith('%'):
+                rows.append(self.parse_data_line(line))
+
+        data = np.full((len(col_indices), len(rows)), np.nan)
+        if not rows:
+            return data
+
+        if all(len(row) == ncols for row in rows):
+            # Fast path: rectangular data, slice columns out of one token list
+            flat = [token for row in rows for token in row]
+            for out_idx, col_idx in enumerate(col_indices):
+                data[out_idx] = _tokens_to_float(flat[col_idx::ncols])
+        else:
+            for out_idx, col_idx in enumerate(col_indices):
+                data[out_idx] = _tokens_to_float(
+                    [row[col_idx] if col_idx < len(row) else 'nan'
+                     for row in rows])
+        return data
+
+    def select_columns(self, column_names, selection, strict=True):
+        """
+        Resolve a column selection to column indices.
+
+        The selection is comma separated; each item is a column name, a tag
+        from categorize_column (e.g. Voltages) or re:<regex>. The time column
+        is always kept. With strict, unknown items raise an error (batch
+        imports are not strict as files may have differing columns).
+        """
+        if not selection.strip():
+            return list(range(len(column_names)))
+
+        column_tags = [c['tags']
+                       for c in self.column_rules.classify_all(column_names)]
+        selected = set()
+        time_col = self.time_column_index(column_names)
+        if time_col is not None:
+            selected.add(time_col)
+
+        unknown = []
+        for item in selection.split(','):
+            item = item.strip()
+            if not item:
+                continue
+
+            if item.startswith('re:'):
+                try:
+                    pattern = re.compile(item[3:])
+                except re.error as e:
+                    raise ImportPluginException(
+                        f"Invalid column regex '{item[3:]}': {e}")
+                matches = [i for i, c in enumerate(column_names)
+                           if pattern.search(c)]
+            elif item in column_names:
+                matches = [column_names.index(item)]
+            else:
+                matches = [i for i, tags in enumerate(column_tags)
+                           if item in tags]
+
+            if not matches:
+                unknown.append(item)
+            selected.update(matches)
+
+        if strict and unknown:
+            raise ImportPluginException(
+                f"No columns match: {', '.join(unknown)}")
+
+        return sorted(selected)
+
+    def read_header(self, f):
+        """
+        Read and parse the header of an open (binary) telemetry file.
+
+        Only the header bytes are read. Returns the parsed header (see
+        split_header) plus the raw header bytes.
+        """
+        chunk = 1 << 16
+        while True:
+            f.seek(0)
+            raw = f.read(chunk)
+            header = self.split_header(raw)
+            # Done once a data line was seen or the whole file was read
+            if header[3] < len(raw) or len(raw) < chunk:
+                return header + (raw[:header[3]],)
+            chunk *= 4
+
+    def parse_time_limit(self, text, base_mjd_timestamp):
+        """
+        Convert a time window limit to seconds after the trigger.
+
+        Accepts a number of seconds after the trigger or an absolute UTC
+        time (needs the trigger stamp). Blank gives None (open ended).
+        """
+        text = text.strip()
+        if not text:
             return None
-        
+        try:
+            return float(text)
+        except ValueError:
+            pass
+
+        for fmt in UTC_TIME_FORMATS:
+            try:
+                utc = datetime.strptime(text, fmt)
+                break
+            except ValueError:
+                continue
+        else:
+            raise ImportPluginException(f"Invalid time window limit: {text}")
+
+        if base_mjd_timestamp is None:
+            raise ImportPluginException(
+                "Absolute time window needs a UTC Trigger Time Stamp header")
+        epoch_seconds = (utc - datetime(1970, 1, 1)).total_seconds()
+        return epoch_seconds - base_mjd_timestamp
+
+    def probe_line_time(self, f, offset, data_offset, time_pos):
+        """
+        Time of the first data line starting at or after a byte offset.
+
+        Returns (line offset, time), or None past the last data line.
+        """
+        if offset > data_offset:
+            # Resynchronise on the next line start
+            f.seek(offset - 1)
+            f.readline()
+        else:
+            f.seek(data_offset)
+
+        while True:
+            line_offset = f.tell()
+            line = f.readline()
+            if not line:
+                return None
+            if line.startswith(b'%'):
+                continue
+            tokens = line.split()
+            try:
+                return line_offset, float(tokens[time_pos])
+            except (ValueError, IndexError):
+                continue
+
+    def bisect_time_offset(self, f, lo, hi, data_offset, time_pos, before):
+        """
+        Bisect the byte range [lo, hi) of a file on the time column.
+
+        before(t) is True for times that lie before the target. Returns a
+        byte offset such that every data line starting before it is before
+        the target, and a byte offset at which a line not before the target
+        (or the end of file) starts. Probed (offset, time) pairs form a
+        sparse line-offset index that only spans the bracket; bisection
+        stops once the bracket is BISECT_MIN_SPAN bytes wide.
+        """
+        while hi - lo > BISECT_MIN_SPAN:
+            mid = (lo + hi) // 2
+            probe = self.probe_line_time(f, mid, data_offset, time_pos)
+            if probe is None or probe[0] >= hi or not before(probe[1]):
+                hi = mid
+            else:
+                lo = probe[0] + 1
+        return lo, hi
+
+    def locate_time_range(self, f, data_offset, size, time_pos,
+                          t_start, t_stop, index=None):
+        """
+        Byte range of the data lines inside a time window.
+
+        Assumes the time column is monotonic. A TelemetryLineIndex narrows
+        the bisection down to one index stride. The range may hold a few
+        lines outside the window; callers trim on the parsed times.
+        """
+        start = data_offset
+        stop = size
+
+        if t_start is not None:
+            lo, hi = data_offset, size
+            if index is not None:
+                lo, hi = index.bracket(t_start)
+                hi = size if hi is None else hi
+            lo, _ = self.bisect_time_offset(
+                f, lo, hi, data_offset, time_pos,
+                lambda t: t < t_start)
+            probe = self.probe_line_time(f, lo, data_offset, time_pos)
+            start = probe[0] if probe is not None else size
+
+        if t_stop is not None:
+            lo, hi = start, size
+            if index is not None:
+                lo, hi = index.bracket(t_stop, before_inclusive=True)
+                lo = max(lo, start)
+                hi = size if hi is None else max(hi, lo)
+            _, hi = self.bisect_time_offset(
+                f, lo, hi, data_offset, time_pos,
+                lambda t: t <= t_stop)
+            probe = self.probe_line_time(f, hi, data_offset, time_pos)
+            stop = probe[0] if probe is not None else size
+
+        return start, max(start, stop)
+
+    def read_file(self, filename, complete_lines_only=False, selection='',
+                  strict=True, time_window=None, line_index=False):
+        """
+        Read and parse a single telemetry file.
+
+        Returns a table dict with header_list, column_names, base_mjd and
+        data (a (ncols, nrows) float array), plus data_offset and end_offset
+        giving the byte range that was parsed. With complete_lines_only a
+        trailing line without a newline (still being written) is left out.
+        Only columns matching selection (see select_columns) are parsed.
+        time_window is an optional (start, stop) pair of time limit strings
+        (see parse_time_limit); only the matching byte range is read, found
+        through the sidecar TelemetryLineIndex if line_index is set.
+        """
+        with open(filename, 'rb') as f:
+            header_list, column_names, base_mjd_timestamp, data_offset, \
+                header_bytes = self.read_header(f)
+
+            if not column_names:
+                raise ImportPluginException(
+                    f"Could not parse column headers: {filename}")
+
+            t_start = t_stop = None
+            start_offset = data_offset
+            if time_window is not None:
+                t_start = self.parse_time_limit(
+                    time_window[0], base_mjd_timestamp)
+                t_stop = self.parse_time_limit(
+                    time_window[1], base_mjd_timestamp)
+                time_pos = self.time_column_index(column_names)
+                if time_pos is None:
+                    raise ImportPluginException(
+                        f"Time window needs a '{TIME_COLUMN}' column")
+
+                index = None
+                if line_index:
+                    index = TelemetryLineIndex.open(
+                        filename, f, data_offset, header_bytes, time_pos)
+
+                f.seek(0, os.SEEK_END)
+                start_offset, stop_offset = self.locate_time_range(
+                    f, data_offset, f.tell(), time_pos, t_start, t_stop,
+                    index)
+                f.seek(start_offset)
+                raw = f.read(stop_offset - start_offset)
+            else:
+                f.seek(data_offset)
+                raw = f.read()
+
+        end_offset = start_offset + len(raw)
+        if complete_lines_only:
+            raw = raw[:raw.rfind(b'\n') + 1]
+            end_offset = start_offset + len(raw)
+
+        col_indices = self.select_columns(column_names, selection, strict)
+
+        # Data lines are plain ASCII numbers, latin-1 can never fail
+        data = self.parse_data_block(
+            raw.decode('latin-1').splitlines(),
+            len(column_names), col_indices)
+
+        if t_start is not None or t_stop is not None:
+            # Exact trim of the few lines around the located byte range
+            times = data[col_indices.index(time_pos)]
+            keep = np.ones(len(times), dtype=bool)
+            if t_start is not None:
+                keep &= times >= t_start
+            if t_stop is not None:
+                keep &= times <= t_stop
+            data = data[:, keep]
+
+        if data.shape[1] == 0 and not complete_lines_only:
+            raise ImportPluginException(f"No data rows found: {filename}")
+
+        return {
+            'header_list': header_list,
+            'column_names': [column_names[i] for i in col_indices],
+            'file_ncols': len(column_names),
+            'col_indices': col_indices,
+            'selection': selection,
+            'base_mjd': base_mjd_timestamp,
+            'data': data,
+            'data_offset': data_offset,
+            'end_offset': end_offset,
+            'header_bytes': header_bytes,
+        }
+
+    def read_file_follow(self, filename, selection=''):
+        """
+        Read a growing telemetry file, parsing only newly appended bytes.
+
+        The byte offset of the last complete line and the parsed columns are
+        kept between imports. Columns live in an over-allocated buffer which
+        is extended in place, so a refresh costs O(new rows). The file is
+        parsed from scratch if it shrank or its header changed.
+        """
+        key = os.path.abspath(filename)
+        size = os.path.getsize(filename)
+        state = _FOLLOW_STATE.get(key)
+
+        if (state is not None and state['selection'] == selection
+                and state['column_rules'] is self.column_rules
+                and size >= state['end_offset']):
+            with open(filename, 'rb') as f:
+                header_ok = f.read(state['data_offset']) == state['header_bytes']
+                if header_ok:
+                    f.seek(state['end_offset'])
+                    raw = f.read(size - state['end_offset'])
+            if header_ok:
+                # Leave a partially written last line for the next refresh
+                complete = raw[:raw.rfind(b'\n') + 1]
+                if complete:
+                    self.append_follow_rows(
+                        state, complete.decode('latin-1').splitlines())
+                    state['end_offset'] += len(complete)
+                return self.follow_table(state)
+
+        table = self.read_file(
+            filename, complete_lines_only=True, selection=selection)
+        state = dict(table)
+        state['rows'] = table['data'].shape[1]
+        state['column_rules'] = self.column_rules
+        state['datetime_strings'] = []
+        state['statistics'] = {'rows': 0, 'columns': {}}
+        _FOLLOW_STATE[key] = state
+        return self.follow_table(state)
+
+    def append_follow_rows(self, state, lines):
+        """Parse appended lines and add them to the follow buffer."""
+        block = self.parse_data_block(
+            lines, state['file_ncols'], state['col_indices'])
+        nnew = block.shape[1]
+        if nnew == 0:
+            return
+
+        rows = state['rows']
+        buffer = state['data']
+        if rows + nnew > buffer.shape[1]:
+            # Grow geometrically so appends are amortised O(new rows)
+            capacity = max(2 * buffer.shape[1], rows + nnew, 1024)
+            grown = np.empty((buffer.shape[0], capacity))
+            grown[:, :rows] = buffer[:, :rows]
+            state['data'] = buffer = grown
+
+        buffer[:, rows:rows + nnew] = block
+        state['rows'] = rows + nnew
+
+    def follow_table(self, state):
+        """Return the table view of the rows parsed so far."""
+        table = dict(state)
+        table['data'] = state['data'][:, :state['rows']]
+        if table['data'].shape[1] == 0:
+            raise ImportPluginException("No data rows found")
+        return table
+
+    def time_column_index(self, column_names):
+        """Return the index of the relative time column, or None."""
+        for col_idx, col_name in enumerate(column_names):
+            if col_name.startswith(TIME_COLUMN):
+                return col_idx
+        return None
+
+    def resolve_batch_files(self, filename, pattern):
+        """Expand a batch directory/glob, relative to the selected file."""
+        if not os.path.isabs(pattern):
+            pattern = os.path.join(os.path.dirname(filename), pattern)
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, '*.dat')
+
+        filenames = sorted(
+            f for f in glob.glob(pattern) if os.path.isfile(f))
+        if not filenames:
+            raise ImportPluginException(f"No files match: {pattern}")
+        return filenames
+
+    def read_files_parallel(self, filenames, workers=0, selection='',
+                            rules_file=''):
+        """
+        Parse several telemetry files, in worker processes if possible.
+
+        Each worker imports this plugin file under _WORKER_MODULE before
+        parsing. Frozen Veusz builds, which cannot start worker
+        interpreters, and any failure to start the workers fall back to
+        parsing serially with a warning.
+        """
+        if workers <= 0:
+            workers = os.cpu_count() or 1
+        workers = min(workers, len(filenames))
+
+        if workers > 1:
+            if getattr(sys, 'frozen', False) or \
+                    not os.path.isfile(_PLUGIN_PATH):
+                reason = 'plugin file cannot be loaded by worker processes'
+            else:
+                loader = _WORKER_LOADER.format(
+                    name=_WORKER_MODULE, path=_PLUGIN_PATH)
+                try:
+                    with ProcessPoolExecutor(
+                            max_workers=workers, initializer=exec,
+                            initargs=(loader, {})) as pool:
+                        return list(pool.map(
+                            _read_telemetry_file, filenames,
+                            [selection] * len(filenames),
+                            [rules_file] * len(filenames)))
+                except ImportPluginException:
+                    raise
+                except Exception as e:
+                    reason = f'worker processes failed: {e}'
+            warnings.warn(
+                f"Batch import: parsing {len(filenames)} files serially "
+                f"({reason})", RuntimeWarning)
+
+        return [_read_telemetry_file(f, selection, rules_file)
+                for f in filenames]
+
+    def merge_two_runs(self, run_a, run_b):
+        """
+        Merge two sorted (keys, rows) runs, keeping run_a first on ties.
+
+        Positions of run_b in the output come from a single searchsorted,
+        so the merge is linear in the output rather than a re-sort.
+        """
+        keys_a, rows_a = run_a
+        keys_b, rows_b = run_b
+
+        # Non-overlapping runs (the usual case for rolling files)
+        if len(keys_a) == 0 or len(keys_b) == 0 or keys_a[-1] <= keys_b[0]:
+            return (np.concatenate([keys_a, keys_b]),
+                    np.concatenate([rows_a, rows_b]))
+        if keys_b[-1] < keys_a[0]:
+            return (np.concatenate([keys_b, keys_a]),
+                    np.concatenate([rows_b, rows_a]))
+
+        total = len(keys_a) + len(keys_b)
+        pos_b = np.searchsorted(keys_a, keys_b, side='right')
+        pos_b += np.arange(len(keys_b))
+
+        from_a = np.ones(total, dtype=bool)
+        from_a[pos_b] = False
+
+        keys = np.empty(total, dtype=keys_a.dtype)
+        rows = np.empty(total, dtype=rows_a.dtype)
+        keys[pos_b] = keys_b
+        rows[pos_b] = rows_b
+        keys[from_a] = keys_a
+        rows[from_a] = rows_a
+        return keys, rows
+
+    def merge_sorted_runs(self, key_runs):
+        """
+        K-way merge of individually sorted key arrays.
+
+        Runs are merged pairwise in a balanced tree (O(n log k)). Returns the
+        merged keys and, for each output row, its index into the
+        concatenation of the input runs.
+        """
+        runs = []
+        start = 0
+        for keys in key_runs:
+            runs.append((keys, np.arange(start, start + len(keys))))
+            start += len(keys)
+
+        if not runs:
+            return np.empty(0), np.empty(0, dtype=np.intp)
+
+        while len(runs) > 1:
+            merged = [self.merge_two_runs(runs[i], runs[i + 1])
+                      for i in range(0, len(runs) - 1, 2)]
+            if len(runs) % 2:
+                merged.append(runs[-1])
+            runs = merged
+
+        return runs[0]
+
+    def merge_parsed_files(self, tables, filenames):
+        """
+        Merge several parsed files into one table ordered on relative time.
+
+        Columns are aligned by name (missing columns are NaN-filled) and each
+        file's relative time is shifted onto the earliest trigger stamp.
+        """
+        base_stamps = [t['base_mjd'] for t in tables
+                       if t['base_mjd'] is not None]
+        base_mjd = min(base_stamps) if base_stamps else None
+
+        # Union of column names in order of first appearance
+        column_index = {}
+        for table in tables:
+            for col_name in table['column_names']:
+                column_index.setdefault(col_name, len(column_index))
+        column_names = list(column_index)
+
+        time_col = self.time_column_index(column_names)
+        if time_col is None:
+            raise ImportPluginException(
+                f"Batch import needs a '{TIME_COLUMN}' column")
+
+        # Sort each file on its own (cheap, usually already sorted)
+        key_runs = []
+        for table, filename in zip(tables, filenames):
+            file_time_col = self.time_column_index(table['column_names'])
+            if file_time_col is None:
+                raise ImportPluginException(
+                    f"No '{TIME_COLUMN}' column in {filename}")
+
+            keys = table['data'][file_time_col].copy()
+            if base_mjd is not None and table['base_mjd'] is not None:
+                keys += table['base_mjd'] - base_mjd
+
+            if np.any(keys[1:] < keys[:-1]):
+                order = np.argsort(keys, kind='stable')
+                keys = keys[order]
+                table['data'] = table['data'][:, order]
+            key_runs.append(keys)
+
+        merged_keys, order = self.merge_sorted_runs(key_runs)
+        total = len(merged_keys)
+
+        # Destination row of every input row
+        dest = np.empty(total, dtype=np.intp)
+        dest[order] = np.arange(total)
+
+        data = np.full((len(column_names), total), np.nan)
+        file_index = np.empty(total)
+        start = 0
+        for file_idx, table in enumerate(tables):
+            nrows = table['data'].shape[1]
+            rows = dest[start:start + nrows]
+            cols = [column_index[c] for c in table['column_names']]
+            data[np.ix_(cols, rows)] = table['data']
+            file_index[rows] = file_idx
+            start += nrows
+        data[time_col] = merged_keys
+
         return {
-            'valid_count': len(valid_data),
-            'nan_count': np.sum(np.isnan(data_array)),
-            'min': float(np.nanmin(data_array)),
-            'max': float(np.nanmax(data_array)),
-            'mean': float(np.nanmean(data_array)),
-            'std': float(np.nanstd(data_array)),
+            'header_list': tables[0]['header_list'],
+            'column_names': column_names,
+            'base_mjd': base_mjd,
+            'data': data,
+            'extra_datasets': [
+                ImportDataset1D('Batch_File_Index', file_index),
+                ImportDatasetText(
+                    'Batch_Files', [os.path.basename(f) for f in filenames]),
+            ],
         }
 
+    def datetime_strings(self, table, time_values, base_mjd_timestamp):
+        """
+        Datetime strings for the time column.
+
+        In follow mode the strings are cached in the follow state, so only
+        rows appended since the last import are converted.
+        """
+        cached = table.get('datetime_strings')
+        start = len(cached) if cached is not None else 0
+
+        new_strings = []
+        for val in time_values[start:]:
+            if not np.isnan(val):
+                dt_str = self.mjd_to_datetime(val, base_mjd_timestamp)
+                new_strings.append(dt_str)
+            else:
+                new_strings.append("Invalid")
+
+        if cached is None:
+            return new_strings
+        cached.extend(new_strings)
+        return list(cached)
+
+    def build_datasets(self, table, convert_timestamp=True):
+        """Create Veusz datasets from a parsed table."""
+        column_names = table['column_names']
+        data = table['data']
+        base_mjd_timestamp = table['base_mjd']
+
+        datasets = []
+        categories = self.column_rules.classify_all(column_names)
+
+        # Create datasets
+        for col_idx in range(len(column_names)):
+            col_name = column_names[col_idx]
+            col_data_array = data[col_idx]
+
+            # Get tags for this column
+            col_tags = list(categories[col_idx]['tags'])
+
+            # Skip all-NaN columns
+            if np.all(np.isnan(col_data_array)):
+                continue
+
+            # Create dataset with JUST column name (no file prefix)
+            dataset_name = col_name
+            dataset = ImportDataset1D(dataset_name, col_data_array)
+
+            # Apply tags
+            if col_tags:
+                dataset.tags = col_tags
+
+            datasets.append(dataset)
+
+            # Also create datetime version if this is the timestamp column
+            if col_name.startswith(TIME_COLUMN) and convert_timestamp and base_mjd_timestamp:
+                datetime_strings = self.datetime_strings(
+                    table, col_data_array, base_mjd_timestamp)
+
+                # Create datetime version with _DateTime suffix
+                datetime_dataset_name = f"{col_name}_DateTime"
+                datetime_dataset = ImportDatasetText(datetime_dataset_name, datetime_strings)
+
+                if col_tags:
+                    datetime_dataset.tags = col_tags
+
+                datasets.append(datetime_dataset)
+
+        datasets.extend(table.get('extra_datasets', []))
+        return datasets
+
+    def build_statistics_datasets(self, table, percentiles=False):
+        """
+        Create a summary table of per-column statistics.
+
+        One row per column: Statistics_Column holds the names, and
+        Statistics_<measure> datasets hold the values. In follow mode the
+        running statistics are kept in the follow state and only appended
+        rows are folded in.
+        """
+        column_names = table['column_names']
+        data = table['data']
+        nrows = data.shape[1]
+
+        cache = table.get('statistics')
+        if cache is None:
+            cache = {'rows': 0, 'columns': {}}
+        elif cache.get('percentiles') != percentiles:
+            cache.clear()
+            cache.update(rows=0, columns={})
+        cache['percentiles'] = percentiles
+
+        results = []
+        for col_idx, col_name in enumerate(column_names):
+            stats = cache['columns'].get(col_name)
+            if stats is None:
+                stats = ColumnStatistics(percentiles=percentiles)
+                cache['columns'][col_name] = stats
+                stats.update(data[col_idx])
+            else:
+                stats.update(data[col_idx, cache['rows']:])
+            result = stats.result()
+            if result is not None:
+                results.append((col_name, result))
+        cache['rows'] = nrows
+
+        if not results:
+            return []
+
+        measures = [('Count', 'valid_count'), ('NaN_Count', 'nan_count'),
+                    ('Min', 'min'), ('Max', 'max'),
+                    ('Mean', 'mean'), ('Std', 'std')]
+        if percentiles:
+            measures += [(f'P{p}', f'p{p}') for p in STATISTICS_PERCENTILES]
+
+        names = ImportDatasetText(
+            'Statistics_Column', [name for name, _ in results])
+        names.tags = ['Statistics']
+        units = ImportDatasetText(
+            'Statistics_Unit',
+            [self.column_rules.classify(name)['unit'] or ''
+             for name, _ in results])
+        units.tags = ['Statistics']
+        datasets = [names, units]
+        for label, key in measures:
+            dataset = ImportDataset1D(
+                f'Statistics_{label}',
+                np.array([result[key] for _, result in results], dtype=np.float64))
+            dataset.tags = ['Statistics']
+            datasets.append(dataset)
+        return datasets
+
+    def power_pairs(self, column_names):
+        """
+        Match voltage and current columns by stem.
+
+        A column <stem>V tagged Voltages pairs with <stem>A tagged
+        Amperages (e.g. PS1CH1V / PS1CH1A). Returns (stem, V index,
+        A index) tuples.
+        """
+        categories = self.column_rules.classify_all(column_names)
+        amperages = {
+            name[:-1]: col_idx for col_idx, name in enumerate(column_names)
+            if name.endswith('A') and 'Amperages' in categories[col_idx]['tags']}
+
+        pairs = []
+        for col_idx, name in enumerate(column_names):
+            if (name.endswith('V') and name[:-1] in amperages
+                    and 'Voltages' in categories[col_idx]['tags']):
+                pairs.append((name[:-1], col_idx, amperages[name[:-1]]))
+        return pairs
+
+    def build_power_datasets(self, table):
+        """
+        Create <stem>_Power and <stem>_Energy datasets (tagged 'Power').
+
+        All pairs are processed together as 2D blocks: one multiply for
+        power and one trapezoidal cumulative sum over the time column for
+        energy (in joules if time is in seconds). Intervals with a NaN
+        sample or time add no energy.
+        """
+        column_names = table['column_names']
+        data = table['data']
+        pairs = self.power_pairs(column_names)
+        if not pairs:
+            return []
+
+        stems = [stem for stem, _, _ in pairs]
+        volts = data[[v for _, v, _ in pairs]]
+        amps = data[[a for _, _, a in pairs]]
+        power = volts * amps
+
+        energy = None
+        time_col = self.time_column_index(column_names)
+        if time_col is not None and data.shape[1] > 0:
+            dt = np.diff(data[time_col])
+            steps = 0.5 * (power[:, 1:] + power[:, :-1]) * dt
+            steps[np.isnan(steps)] = 0.0
+            energy = np.zeros_like(power)
+            np.cumsum(steps, axis=1, out=energy[:, 1:])
+
+        datasets = []
+        for pair_idx, stem in enumerate(stems):
+            dataset = ImportDataset1D(f"{stem}_Power", power[pair_idx])
+            dataset.tags = ['Power']
+            datasets.append(dataset)
+            if energy is not None:
+                dataset = ImportDataset1D(f"{stem}_Energy", energy[pair_idx])
+                dataset.tags = ['Power']
+                datasets.append(dataset)
+        return datasets
+
+    def sorted_on_time(self, table):
+        """
+        Return the table with rows in time order and without NaN times.
+
+        The table is returned unchanged if it already is.
+        """
+        time_col = self.time_column_index(table['column_names'])
+        if time_col is None:
+            raise ImportPluginException(
+                f"Gap detection and resampling need a '{TIME_COLUMN}' column")
+
+        data = table['data']
+        times = data[time_col]
+        valid = ~np.isnan(times)
+        if valid.all() and not np.any(times[1:] < times[:-1]):
+            return table
+
+        rows = np.flatnonzero(valid)
+        rows = rows[np.argsort(times[rows], kind='stable')]
+        table = self.table_for_rows(table, rows)
+        table['data'] = data[:, rows]
+        return table
+
+    def table_for_rows(self, table, rows):
+        """
+        Copy of table for a new row order, without the row based caches.
+
+        Row-aligned extra datasets (the batch file index) are taken at
+        rows; the caller sets the new 'data'.
+        """
+        nrows = table['data'].shape[1]
+        extra_datasets = []
+        for dataset in table.get('extra_datasets', []):
+            if (isinstance(dataset, ImportDataset1D)
+                    and len(dataset.data) == nrows):
+                dataset = ImportDataset1D(dataset.name, dataset.data[rows])
+            extra_datasets.append(dataset)
+
+        # Follow mode caches are row based and do not apply any more
+        table = {k: v for k, v in table.items()
+                 if k not in ('statistics', 'datetime_strings')}
+        if extra_datasets:
+            table['extra_datasets'] = extra_datasets
+        return table
+
+    def detect_gaps(self, times, gap_factor):
+        """
+        Find time steps longer than gap_factor median sample periods.
+
+        Returns (median period, boolean array over the len(times) - 1
+        steps). With gap_factor 0 no step is a gap.
+        """
+        steps = np.diff(times)
+        period = float(np.median(steps)) if len(steps) else 0.0
+        if gap_factor <= 0 or period <= 0:
+            return period, np.zeros(len(steps), dtype=bool)
+        return period, steps > gap_factor * period
+
+    def build_gap_datasets(self, times, gaps):
+        """Gaps_Start / Gaps_Stop / Gaps_Duration datasets (tagged 'Gaps')."""
+        gap_idx = np.flatnonzero(gaps)
+        start = times[gap_idx]
+        stop = times[gap_idx + 1]
+
+        datasets = []
+        for name, values in (('Gaps_Start', start), ('Gaps_Stop', stop),
+                             ('Gaps_Duration', stop - start)):
+            dataset = ImportDataset1D(name, values)
+            dataset.tags = ['Gaps']
+            datasets.append(dataset)
+        return datasets
+
+    def resample_table(self, table, period, gaps):
+        """
+        Resample every column onto a uniform time grid.
+
+        The bracketing samples and weights are found once
+        (np.searchsorted) and applied to the whole (columns x rows) block
+        in one batched interpolation. StateValues columns use zero-order
+        hold instead of linear interpolation, as do row-aligned extra
+        datasets (the batch file index). Grid points inside a gap are NaN
+        so lines do not bridge missing data.
+        """
+        column_names = table['column_names']
+        data = table['data']
+        time_col = self.time_column_index(column_names)
+        times = data[time_col]
+
+        # The tolerance keeps the last sample of already uniform data
+        nsteps = int(np.floor((times[-1] - times[0]) / period + 1e-9)) + 1
+        grid = times[0] + np.arange(nsteps) * period
+
+        left = np.clip(np.searchsorted(times, grid, side='right') - 1,
+                       0, len(times) - 2)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weight = (grid - times[left]) / (times[left + 1] - times[left])
+        weight = np.clip(np.nan_to_num(weight), 0.0, 1.0)
+
+        categories = self.column_rules.classify_all(column_names)
+        hold = np.array(['StateValues' in c['tags'] for c in categories])
+
+        resampled = np.empty((len(column_names), nsteps))
+        linear = np.flatnonzero(~hold)
+        resampled[linear] = (data[linear][:, left] * (1.0 - weight)
+                             + data[linear][:, left + 1] * weight)
+        held = np.flatnonzero(hold)
+        held_rows = left + (weight >= 1.0)
+        if len(held):
+            resampled[held] = data[held][:, held_rows]
+
+        resampled[:, gaps[left] & (weight > 0.0)] = np.nan
+        resampled[time_col] = grid
+
+        table = self.table_for_rows(table, held_rows)
+        table['data'] = resampled
+        return table
+
+    def compact_state_column(self, values):
+        """
+        Return values as int8 if it is a low-cardinality integer column.
+
+        The int8 copy is only used to find transitions; Veusz stores
+        dataset values as float64 whatever dtype they are handed in.
+        Returns None if the column has NaNs, non-integer values, values
+        outside the int8 range or more than STATE_MAX_LEVELS levels.
+        """
+        if len(values) == 0:
+            return None
+        vmin = values.min()
+        vmax = values.max()
+        if not (-128 <= vmin and vmax <= 127):
+            # Also catches NaN, which fails both comparisons
+            return None
+        compact = values.astype(np.int8)
+        if not np.array_equal(compact, values):
+            return None
+        if np.count_nonzero(np.bincount(compact.astype(np.intp) + 128)) \
+                > STATE_MAX_LEVELS:
+            return None
+        return compact
+
+    def build_state_datasets(self, table):
+        """
+        Compact state channels and build their transition tables.
+
+        Candidates are columns tagged StateValues and untagged columns.
+        Each compactable column gets <col>_transition_time, _old and
+        _new datasets (tagged 'Transitions'). The first row holds the
+        initial state (old = NaN) so the channel can be rebuilt from the
+        transitions alone. Returns (datasets, {column name: int8 array}).
+        """
+        column_names = table['column_names']
+        data = table['data']
+        categories = self.column_rules.classify_all(column_names)
+
+        time_col = self.time_column_index(column_names)
+        if time_col is not None:
+            times = data[time_col]
+        else:
+            times = np.arange(data.shape[1], dtype=np.float64)
+
+        datasets = []
+        compacted = {}
+        for col_idx, col_name in enumerate(column_names):
+            tags = categories[col_idx]['tags']
+            if col_idx == time_col or (tags and 'StateValues' not in tags):
+                continue
+            compact = self.compact_state_column(data[col_idx])
+            if compact is None:
+                continue
+            compacted[col_name] = compact
+
+            changes = np.flatnonzero(np.diff(compact)) + 1
+            starts = np.concatenate([[0], changes])
+            old = np.empty(len(starts))
+            old[0] = np.nan
+            old[1:] = compact[changes - 1]
+
+            for suffix, values in (('time', times[starts]), ('old', old),
+                                   ('new', compact[starts])):
+                dataset = ImportDataset1D(
+                    f"{col_name}_transition_{suffix}",
+                    values.astype(np.float64))
+                dataset.tags = ['Transitions']
+                datasets.append(dataset)
+
+        return datasets, compacted
+
+    def parse_decimation_sizes(self, text):
+        """Parse the comma separated decimation target sizes."""
+        sizes = []
+        for item in text.replace(';', ',').split(','):
+            item = item.strip()
+            if not item:
+                continue
+            try:
+                size = int(item)
+            except ValueError:
+                raise ImportPluginException(
+                    f"Invalid decimation size: {item}")
+            if size < 3:
+                raise ImportPluginException(
+                    f"Decimation size must be at least 3: {size}")
+            sizes.append(size)
+        return sorted(set(sizes), reverse=True)
+
+    def decimate_minmax(self, values, starts):
+        """Min and max of every bucket (NaN ignored), one reduceat each."""
+        with np.errstate(invalid='ignore'):
+            return (np.fmin.reduceat(values, starts),
+                    np.fmax.reduceat(values, starts))
+
+    def decimate_lttb(self, x, y, nout):
+        """
+        Largest-Triangle-Three-Buckets downsampling to about nout points.
+
+        Every bucket picks the point forming the largest triangle with the
+        centroid of the previous bucket and the centroid of the next one.
+        Anchoring on the previous centroid (rather than the previously
+        selected point) removes the bucket-to-bucket dependency, so all
+        buckets are solved in one vectorized pass. Buckets that are all NaN
+        are dropped. Returns the selected indices.
+        """
+        n = len(y)
+        if nout >= n:
+            return np.arange(n)
+
+        # First and last points are always kept, the rest is bucketed
+        starts = np.linspace(1, n - 1, nout - 1).astype(np.intp)[:-1]
+        counts = np.diff(np.append(starts, n - 1))
+        bucket = np.repeat(np.arange(len(starts)), counts)
+
+        valid = ~np.isnan(y)
+        y0 = np.where(valid, y, 0.0)
+        x0 = np.where(valid, x, 0.0)
+        nvalid = np.add.reduceat(valid.astype(np.float64)[1:n - 1], starts - 1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cx = np.add.reduceat(x0[1:n - 1], starts - 1) / nvalid
+            cy = np.add.reduceat(y0[1:n - 1], starts - 1) / nvalid
+
+        # Anchors: previous centroid (A) and next centroid (C) per bucket
+        ax = np.concatenate([[x[0]], cx[:-1]])
+        ay = np.concatenate([[y[0]], cy[:-1]])
+        nx = np.concatenate([cx[1:], [x[-1]]])
+        ny = np.concatenate([cy[1:], [y[-1]]])
+
+        bx = x[1:n - 1]
+        by = y[1:n - 1]
+        ax, ay, nx, ny = ax[bucket], ay[bucket], nx[bucket], ny[bucket]
+        area = np.abs((ax - nx) * (by - ay) - (ax - bx) * (ny - ay))
+
+        with np.errstate(invalid='ignore'):
+            best = np.fmax.reduceat(area, starts - 1)
+        hits = np.flatnonzero(area == best[bucket])
+        _, first = np.unique(bucket[hits], return_index=True)
+
+        return np.concatenate([[0], hits[first] + 1, [n - 1]])
+
+    def build_decimated_datasets(self, table, sizes, method):
+        """
+        Create decimated companion datasets tagged 'Decimated'.
+
+        A target size N gives N/2 min/max buckets (N envelope points) that
+        share one bucket-centre time dataset per size. LTTB datasets get
+        their own time dataset as the picked points differ per column. The
+        full resolution datasets are left untouched.
+        """
+        column_names = table['column_names']
+        data = table['data']
+        nrows = data.shape[1]
+
+        time_col = self.time_column_index(column_names)
+        if time_col is not None:
+            time_name = column_names[time_col]
+            x = data[time_col]
+        else:
+            time_name = 'Row'
+            x = np.arange(nrows, dtype=np.float64)
+
+        datasets = []
+        for size in sizes:
+            if size >= nrows:
+                continue
+
+            do_minmax = method in ('Min/Max envelope', 'Both')
+            do_lttb = method in ('LTTB', 'Both')
+
+            if do_minmax:
+                nbuckets = size // 2
+                starts = np.linspace(0, nrows, nbuckets + 1).astype(np.intp)[:-1]
+                ends = np.append(starts[1:], nrows) - 1
+                bucket_time = ImportDataset1D(
+                    f"{time_name}_bucket{size}", 0.5 * (x[starts] + x[ends]))
+                bucket_time.tags = ['Decimated']
+                datasets.append(bucket_time)
+
+            for col_idx, col_name in enumerate(column_names):
+                if col_idx == time_col:
+                    continue
+                values = data[col_idx]
+                if np.all(np.isnan(values)):
+                    continue
+
+                if do_minmax:
+                    mins, maxs = self.decimate_minmax(values, starts)
+                    for suffix, result in (('min', mins), ('max', maxs)):
+                        dataset = ImportDataset1D(
+                            f"{col_name}_{suffix}{size}", result)
+                        dataset.tags = ['Decimated']
+                        datasets.append(dataset)
+
+                if do_lttb:
+                    picked = self.decimate_lttb(x, values, size)
+                    dataset = ImportDataset1D(
+                        f"{col_name}_lttb{size}", values[picked])
+                    dataset.tags = ['Decimated']
+                    datasets.append(dataset)
+                    dataset = ImportDataset1D(
+                        f"{col_name}_lttb{size}_time", x[picked])
+                    dataset.tags = ['Decimated']
+                    datasets.append(dataset)
+
+        return datasets
+
+    def preview_times(self, lines, time_pos):
+        """Times of the parseable data lines in a list of raw lines."""
+        times = []
+        for line in lines:
+            if not line.strip() or line.startswith(b'%'):
+                continue
+            try:
+                times.append(float(line.split()[time_pos]))
+            except (ValueError, IndexError):
+                continue
+        return times
+
+    def getPreview(self, params):
+        """
+        Generate a preview of what will be imported.
+
+        Only the header and PREVIEW_SAMPLE_BYTES from the start and end of
+        the data are read, so the preview is instant on multi-GB files. The
+        row count comes from a current sidecar line index if there is one,
+        otherwise it is estimated from the file size and the average line
+        length of the sample.
+
+        Returns (preview text, okay to import).
+        """
+        try:
+            filename = params.filename
+            if not filename or not os.path.exists(filename):
+                return "File not found", False
+
+            field_results = getattr(params, 'field_results', None) or {}
+            self.column_rules = load_column_rules(
+                field_results.get('rules_file', '').strip())
+
+            with open(filename, 'rb') as f:
+                header_list, column_names, base_mjd, data_offset, \
+                    header_bytes = self.read_header(f)
+                if not column_names:
+                    return "Could not parse column headers", False
+
+                f.seek(0, os.SEEK_END)
+                size = f.tell()
+
+                f.seek(data_offset)
+                head = f.read(PREVIEW_SAMPLE_BYTES)
+                tail_start = max(data_offset, size - PREVIEW_SAMPLE_BYTES)
+                f.seek(tail_start)
+                tail = f.read()
+
+                time_pos = self.time_column_index(column_names)
+                index = None
+                if time_pos is not None:
+                    index = TelemetryLineIndex.open(
+                        filename, f, data_offset, header_bytes, time_pos,
+                        update=False)
+
+            # Complete lines only: drop partial lines at the sample edges
+            head_lines = head.splitlines(keepends=True)
+            if head_lines and not head_lines[-1].endswith(b'\n') \
+                    and data_offset + len(head) < size:
+                head_lines.pop()
+            tail_lines = tail.splitlines(keepends=True)
+            if tail_start > data_offset and tail_lines:
+                tail_lines.pop(0)
+
+            data_bytes = size - data_offset
+            if index is not None:
+                rows_text = f"{index.rows} (from line index)"
+            elif head_lines:
+                sample_bytes = sum(len(line) for line in head_lines)
+                estimate = int(round(
+                    data_bytes * len(head_lines) / sample_bytes))
+                rows_text = f"~{estimate} (estimated)"
+            else:
+                rows_text = "0"
+
+            preview_lines = [
+                f"File: {os.path.basename(filename)}",
+                f"Size: {size / 1e6:.1f} MB",
+                f"Columns: {len(column_names)}",
+                f"Data rows: {rows_text}",
+            ]
+
+            if time_pos is not None:
+                first = self.preview_times(head_lines, time_pos)
+                last = self.preview_times(tail_lines, time_pos)
+                if first and last:
+                    preview_lines.append(
+                        f"Time span: {first[0]:g} s to {last[-1]:g} s "
+                        f"({last[-1] - first[0]:g} s)")
+                    if base_mjd is not None:
+                        preview_lines.append(
+                            f"UTC: {self.mjd_to_datetime(first[0], base_mjd)}"
+                            f" to {self.mjd_to_datetime(last[-1], base_mjd)}")
+            preview_lines.append("")
+
+            # Columns grouped by tag, untagged ones under Other
+            groups = {}
+            for col_name, category in zip(
+                    column_names, self.column_rules.classify_all(column_names)):
+                for tag in category['tags'] or ['Other']:
+                    groups.setdefault(tag, []).append(col_name)
+            if 'Other' in groups:
+                groups['Other'] = groups.pop('Other')
+
+            preview_lines.append("Column Names and Classifications:")
+            for tag, cols in groups.items():
+                col_str = f"  {tag} ({len(cols)}): {', '.join(cols[:3])}"
+                if len(cols) > 3:
+                    col_str += f" ... +{len(cols) - 3} more"
+                preview_lines.append(col_str)
+
+            if header_list:
+                preview_lines.append("")
+                preview_lines.append("Header Information:")
+                for header_line in header_list[:3]:
+                    if len(header_line) > 70:
+                        preview_lines.append(f"  {header_line[:67]}...")
+                    else:
+                        preview_lines.append(f"  {header_line}")
+                if len(header_list) > 3:
+                    preview_lines.append(
+                        f"  ... and {len(header_list) - 3} more header lines")
+
+            return "\n".join(preview_lines), True
+
+        except ImportPluginException as e:
+            return str(e), False
+        except Exception as e:
+            return f"Error generating preview: {str(e)}", False
+
     def doImport(self, params):
         """
         Import the RPi TKu telemetry file data.
@@ -170,94 +2005,71 @@ class RPiTKuImportPluginEnhanced(ImportPlugin):
             field_results = params.field_results if hasattr(params, 'field_results') else {}
             convert_timestamp = field_results.get('convert_timestamp', True)
             store_statistics = field_results.get('store_statistics', True)
+            batch_pattern = field_results.get('batch_pattern', '').strip()
+            follow_mode = field_results.get('follow_mode', False)
+            selection = field_results.get('columns', '')
+            rules_file = field_results.get('rules_file', '').strip()
+            time_window = (field_results.get('time_start', ''),
+                           field_results.get('time_stop', ''))
+            if not any(limit.strip() for limit in time_window):
+                time_window = None
+            self.column_rules = load_column_rules(rules_file)
+            decimation_sizes = self.parse_decimation_sizes(
+                field_results.get('decimation_sizes', ''))
+            decimation_method = field_results.get('decimation_method', 'Both')
 
-            # Read file with encoding detection
-            lines = []
-            for enc in ['utf-8', 'cp1252', 'latin-1']:
-                try:
-                    with open(filename, 'r', encoding=enc) as f:
-                        lines = f.readlines()
-                    break
-                except UnicodeDecodeError:
-                    continue
-
-            if not lines:
-                raise ImportPluginException("Could not read file with any encoding")
+            if time_window is not None and (batch_pattern or follow_mode):
+                raise ImportPluginException(
+                    "Time window import cannot be combined with batch or "
+                    "follow mode")
 
-            # Parse header
-            header_list, column_names, data_start_idx, base_mjd_timestamp = self.parse_header(lines)
+            if batch_pattern:
+                # Batch mode: parse every matching file and merge on time
+                filenames = self.resolve_batch_files(filename, batch_pattern)
+                tables = self.read_files_parallel(
+                    filenames, field_results.get('batch_workers', 0),
+                    selection, rules_file)
+                table = self.merge_parsed_files(tables, filenames)
+            elif follow_mode:
+                table = self.read_file_follow(filename, selection)
+            else:
+                table = self.read_file(
+                    filename, selection=selection, time_window=time_window,
+                    line_index=field_results.get('line_index', False))
 
-            if not column_names:
-                raise ImportPluginException("Could not parse column headers")
-
-            # Parse data
-            data_values = []
-            for i in range(data_start_idx, len(lines)):
-                line = lines[i].rstrip('\r\n')
-                if line and not line.startswith('%'):
-                    try:
-                        values = self.parse_data_line(line)
-                        data_values.append(values)
-                    except (ValueError, IndexError):
-                        pass
-
-            if not data_values:
-                raise ImportPluginException("No data rows found")
-
-            datasets = []
-
-            # Create datasets
-            for col_idx in range(len(column_names)):
-                col_name = column_names[col_idx]
-                col_data = []
-
-                # Extract column data
-                for row_idx in range(len(data_values)):
-                    if col_idx < len(data_values[row_idx]):
-                        try:
-                            value = float(data_values[row_idx][col_idx])
-                            col_data.append(value)
-                        except ValueError:
-                            col_data.append(np.nan)
+            gap_factor = field_results.get('gap_factor', 0.0)
+            resample_uniform = field_results.get('resample_uniform', False)
+            gap_datasets = []
+            if gap_factor > 0 or resample_uniform:
+                table = self.sorted_on_time(table)
+                times = table['data'][self.time_column_index(
+                    table['column_names'])]
+                period, gaps = self.detect_gaps(times, gap_factor)
+                if gap_factor > 0:
+                    gap_datasets = self.build_gap_datasets(times, gaps)
+                if resample_uniform and period > 0:
+                    table = self.resample_table(table, period, gaps)
 
-                # Get tags for this column
-                col_tags = self.categorize_column(col_name)
-                
-                # Create the main numeric dataset (always)
-                col_data_array = np.array(col_data)
-                
-                # Skip all-NaN columns
-                if np.all(np.isnan(col_data_array)):
-                    continue
+            datasets = self.build_datasets(table, convert_timestamp)
+            datasets.extend(gap_datasets)
 
-                # Create dataset with JUST column name (no file prefix)
-                dataset_name = col_name
-                dataset = ImportDataset1D(dataset_name, col_data_array)
+            state_storage = field_results.get('state_storage', 'Full')
+            if state_storage != 'Full':
+                state_datasets, compacted = self.build_state_datasets(table)
+                if state_storage == 'Transitions only':
+                    datasets = [d for d in datasets if d.name not in compacted]
+                datasets.extend(state_datasets)
 
-                # Apply tags
-                if col_tags:
-                    dataset.tags = col_tags
+            if field_results.get('derive_power', False):
+                datasets.extend(self.build_power_datasets(table))
 
-                datasets.append(dataset)
+            if store_statistics:
+                datasets.extend(self.build_statistics_datasets(
+                    table, field_results.get('statistics_percentiles', False)))
 
-                # Also create datetime version if this is the timestamp column
-                if col_name.startswith('UTC Now minus UTC Trigger') and convert_timestamp and base_mjd_timestamp:
-                    datetime_strings = []
-                    for val in col_data:
-                        if not np.isnan(val):
-                            dt_str = self.mjd_to_datetime(val, base_mjd_timestamp)
-                            datetime_strings.append(dt_str)
-                        else:
-                            datetime_strings.append("Invalid")
-                    
-                    # Create datetime version with _DateTime suffix
-                    datetime_dataset_name = f"{col_name}_DateTime"
-                    datetime_dataset = ImportDatasetText(datetime_dataset_name, datetime_strings)
-                    
-                    if col_tags:
-                        datetime_dataset.tags = col_tags
-                    
-                    datasets.append(datetime_dataset)
+            if decimation_sizes:
+                datasets.extend(self.build_decimated_datasets(
+                    table, decimation_sizes, decimation_method))
 
             if not datasets:
                 raise ImportPluginException("No valid data columns found")
@@ -0,0 +1,599 @@
+# -*- coding: utf-8 -*-
+"""
+Telemetry Analysis Dataset Plugins for Veusz.
+
+Dataset plugins operating on channels imported with the RPi TKu telemetry
+import plugin (rpi_tku_import_plugin.py):
+- Rolling window statistics (mean, std, min, max)
+- Welch power spectral density and spectrogram
+- Cross-channel correlation matrix (and lagged cross-correlation) by tag
+
+Author: William W. Wallace
+"""
+
+# %% Module Import
+import numpy as np
+from functools import lru_cache
+from veusz.plugins.datasetplugin import (
+    DatasetPlugin, DatasetPluginException, Dataset1D, Dataset2D,
+    DatasetText, datasetpluginregistry
+    )
+from veusz.plugins import (field)
+
+
+# Relative time column written by the RPi TKu importer
+TIME_DATASET = 'UTC Now minus UTC Trigger'
+
+# Spectral windows (periodic form, as used for spectral estimation)
+SPECTRAL_WINDOWS = ('hann', 'hamming', 'blackman', 'boxcar')
+
+
+@lru_cache(maxsize=32)
+def _spectral_window(name, length):
+    """Cached, read-only periodic window array."""
+    if name == 'boxcar':
+        window = np.ones(length)
+    else:
+        window = {'hann': np.hanning, 'hamming': np.hamming,
+                  'blackman': np.blackman}[name](length + 1)[:-1]
+    window.flags.writeable = False
+    return window
+
+
+# %% Helpers
+class _TelemetryMath:
+    """Static vectorized helpers shared by the telemetry plugins."""
+
+    @staticmethod
+    def window_bounds(n, window, units, times=None):
+        """
+        Trailing window [left, right) for every sample.
+
+        Windows in 'samples' hold the last `window` samples, windows in
+        'seconds' hold the samples with time in (t - window, t].
+        """
+        right = np.arange(1, n + 1)
+        if units == 'seconds':
+            left = np.searchsorted(times, times - window, side='right')
+        else:
+            left = np.maximum(right - max(int(window), 1), 0)
+        return left, right
+
+    @staticmethod
+    def rolling_mean_std(values, left, right):
+        """
+        Windowed mean and (population) std from cumulative sums, O(n).
+
+        NaNs are skipped. Values are shifted by their mean first to limit
+        cancellation in the sum of squares.
+        """
+        valid = ~np.isnan(values)
+        shift = values[valid].mean() if valid.any() else 0.0
+        shifted = np.where(valid, values - shift, 0.0)
+
+        csum = np.concatenate([[0.0], np.cumsum(shifted)])
+        csq = np.concatenate([[0.0], np.cumsum(shifted * shifted)])
+        ccount = np.concatenate([[0], np.cumsum(valid)])
+
+        count = ccount[right] - ccount[left]
+        total = csum[right] - csum[left]
+        total_sq = csq[right] - csq[left]
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = total / count
+            var = np.maximum(total_sq / count - mean * mean, 0.0)
+        return mean + shift, np.sqrt(var)
+
+    @staticmethod
+    def rolling_extreme(values, left, right, ufunc):
+        """
+        Windowed reduction (np.fmin / np.fmax) over [left, right).
+
+        Sparse-table range queries computed one doubling level at a time:
+        a window of length L is covered by two overlapping blocks of length
+        2**floor(log2(L)), answered when that level is reached. Only one
+        level is held in memory, so this is O(n log W) time and O(n) memory
+        for both fixed and time-based (variable length) windows.
+        """
+        length = right - left
+        out = np.full(len(left), np.nan)
+        if len(out) == 0:
+            return out
+
+        # floor(log2(length)), exact for integers
+        level_of = np.frexp(length)[1] - 1
+        order = np.argsort(level_of, kind='stable')
+        splits = np.searchsorted(level_of[order], np.arange(level_of.max() + 2))
+
+        level = values
+        span = 1
+        for k in range(level_of.max() + 1):
+            queries = order[splits[k]:splits[k + 1]]
+            if len(queries):
+                out[queries] = ufunc(level[left[queries]],
+                                     level[right[queries] - span])
+            if k < level_of.max():
+                level = ufunc(level[:-span], level[span:])
+                span *= 2
+        return out
+
+    @staticmethod
+    def sample_rate(times):
+        """Sample rate from the median sample period of a time dataset."""
+        steps = np.diff(times[np.isfinite(times)])
+        period = np.median(steps) if len(steps) else 0.0
+        if not period > 0:
+            raise DatasetPluginException(
+                "Cannot determine the sample rate from the time dataset")
+        return 1.0 / period
+
+    @staticmethod
+    def stack_channels(arrays):
+        """
+        Stack channels into a (channels, n) block of the common length.
+
+        NaNs are replaced by the channel mean so they do not spread through
+        FFTs and correlations.
+        """
+        n = min(len(a) for a in arrays)
+        block = np.empty((len(arrays), n))
+        for row, values in zip(block, arrays):
+            row[:] = values[:n]
+            missing = np.isnan(row)
+            if missing.any():
+                row[missing] = row[~missing].mean() if (~missing).any() else 0.0
+        return block
+
+    @staticmethod
+    def welch_segments(block, fs, nperseg, noverlap, window):
+        """
+        Power spectral density of every segment of every channel.
+
+        Segments are strided views of the (channels, n) block (no copies
+        until windowing), each is mean-detrended and all are transformed by
+        one batched rfft. Returns (frequencies, one-sided density with
+        shape (channels, segments, frequencies), segment start indices).
+        """
+        step = nperseg - noverlap
+        frames = np.lib.stride_tricks.sliding_window_view(
+            block, nperseg, axis=1)[:, ::step, :]
+        win = _spectral_window(window, nperseg)
+
+        spectrum = np.fft.rfft(
+            (frames - frames.mean(axis=2, keepdims=True)) * win, axis=2)
+        density = spectrum.real ** 2 + spectrum.imag ** 2
+        density *= 1.0 / (fs * np.dot(win, win))
+
+        # One-sided: double everything except DC (and Nyquist if present)
+        if nperseg % 2:
+            density[..., 1:] *= 2.0
+        else:
+            density[..., 1:-1] *= 2.0
+
+        freqs = np.fft.rfftfreq(nperseg, 1.0 / fs)
+        starts = np.arange(frames.shape[1]) * step
+        return freqs, density, starts
+
+    @staticmethod
+    def average_ranks(values):
+        """Ranks of values with ties given their average rank."""
+        _, inverse, counts = np.unique(
+            values, return_inverse=True, return_counts=True)
+        return (np.cumsum(counts) - 0.5 * (counts - 1))[inverse]
+
+    @staticmethod
+    def lagged_xcorr(block, reference, max_lag):
+        """
+        Normalised cross-correlation of every channel with a reference.
+
+        Uses one batched rfft of the (channels, n) block. Returns an array
+        of shape (channels, 2 * max_lag + 1) for lags -max_lag..max_lag
+        (samples); at lag k channel sample t + k meets reference sample t.
+        """
+        n = block.shape[1]
+        nfft = 1 << int(np.ceil(np.log2(2 * n - 1)))
+
+        def standardise(x):
+            centred = x - x.mean(axis=-1, keepdims=True)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return centred / centred.std(axis=-1, keepdims=True)
+
+        spectra = np.fft.rfft(standardise(block), nfft, axis=1)
+        ref_spectrum = np.fft.rfft(standardise(reference), nfft)
+        circular = np.fft.irfft(spectra * np.conj(ref_spectrum), nfft, axis=1)
+        lags = np.arange(-max_lag, max_lag + 1)
+        return circular[:, lags % nfft] / n
+
+    @staticmethod
+    def power_db(arr):
+        """10*log10 of a power quantity, non-finite results become NaN."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out = 10.0 * np.log10(arr)
+        return np.where(np.isfinite(out), out, np.nan)
+
+
+# %% Plugins
+class RollingStatisticsPlugin(_TelemetryMath, DatasetPlugin):
+    """Dataset plugin computing rolling statistics of telemetry channels."""
+
+    # Plugin metadata
+    menu = ("Telemetry", "Rolling Statistics")
+    name = "Telemetry_Rolling_Statistics"
+    author = "William W. Wallace"
+    description_short = "Rolling mean, std, min and max of channels"
+    description_full = (
+        "Computes trailing-window mean, standard deviation, minimum and "
+        "maximum of telemetry channels. The window is a number of samples "
+        "or a duration in seconds on the (irregular) time dataset. Mean and "
+        "std use cumulative sums, min and max use sparse-table range "
+        "queries, so large channels are processed in O(n log window)."
+    )
+
+    def __init__(self):
+        """Define input fields for the plugin."""
+        self.fields = [
+            field.FieldDatasetMulti(
+                'input_datasets',
+                'Input telemetry datasets'
+            ),
+            field.FieldDataset(
+                'time_dataset',
+                'Time dataset (windows in seconds)',
+                default=TIME_DATASET
+            ),
+            field.FieldFloat(
+                'window',
+                'Window length',
+                default=100.0,
+                minval=0.0
+            ),
+            field.FieldCombo(
+                'window_units',
+                'Window units',
+                default='samples',
+                items=('samples', 'seconds'),
+                editable=False
+            ),
+            field.FieldText(
+                'output_suffix',
+                'Output dataset suffix',
+                default='_roll'
+            ),
+        ]
+
+    def getDatasets(self, fields):
+        """Define output datasets: mean, std, min and max per input."""
+        input_names = [n for n in fields['input_datasets'] if n.strip()]
+        if not input_names:
+            raise DatasetPluginException("No input datasets selected")
+
+        suffix = fields['output_suffix']
+        self.outputs = []
+        for name in input_names:
+            self.outputs.append(
+                [Dataset1D(f"{name}{suffix}_{stat}")
+                 for stat in ('mean', 'std', 'min', 'max')])
+        return [ds for group in self.outputs for ds in group]
+
+    def updateDatasets(self, fields, helper):
+        """Compute the rolling statistics."""
+        input_names = [n for n in fields['input_datasets'] if n.strip()]
+        window = fields['window']
+        units = fields['window_units']
+
+        if window <= 0:
+            raise DatasetPluginException("Window length must be positive")
+
+        try:
+            input_datasets = helper.getDatasets(input_names, dimensions=1)
+        except Exception as e:
+            raise DatasetPluginException(
+                f"Error getting input datasets: {str(e)}")
+
+        times = None
+        if units == 'seconds':
+            try:
+                times = helper.getDataset(
+                    fields['time_dataset'], dimensions=1).data
+            except Exception as e:
+                raise DatasetPluginException(
+                    f"Error getting time dataset: {str(e)}")
+            if np.any(times[1:] < times[:-1]):
+                raise DatasetPluginException(
+                    "Time dataset must be monotonically increasing")
+
+        for dataset, outputs in zip(input_datasets, self.outputs):
+            values = np.asarray(dataset.data, dtype=np.float64)
+            if times is not None:
+                n = min(len(values), len(times))
+                values = values[:n]
+                left, right = self.window_bounds(
+                    n, window, units, times[:n])
+            else:
+                left, right = self.window_bounds(len(values), window, units)
+
+            mean, std = self.rolling_mean_std(values, left, right)
+            vmin = self.rolling_extreme(values, left, right, np.fmin)
+            vmax = self.rolling_extreme(values, left, right, np.fmax)
+
+            for output, result in zip(outputs, (mean, std, vmin, vmax)):
+                output.update(data=result)
+
+
+class WelchPSDPlugin(_TelemetryMath, DatasetPlugin):
+    """Dataset plugin computing Welch PSDs (and spectrograms) of channels."""
+
+    # Plugin metadata
+    menu = ("Telemetry", "Welch PSD")
+    name = "Telemetry_Welch_PSD"
+    author = "William W. Wallace"
+    description_short = "Welch power spectral density of channels in dB"
+    description_full = (
+        "Computes the Welch power spectral density of one or more "
+        "telemetry channels, in dB (10*log10, power quantity), and "
+        "optionally a spectrogram as a 2D dataset. The sample rate is "
+        "taken from the median period of the time dataset unless given. "
+        "Channels are truncated to a common length and NaNs are replaced "
+        "by the channel mean."
+    )
+
+    def __init__(self):
+        """Define input fields for the plugin."""
+        self.fields = [
+            field.FieldDatasetMulti(
+                'input_datasets',
+                'Input telemetry datasets'
+            ),
+            field.FieldDataset(
+                'time_dataset',
+                'Time dataset (for the sample rate)',
+                default=TIME_DATASET
+            ),
+            field.FieldFloat(
+                'sample_rate',
+                'Sample rate in Hz (0 = from time dataset)',
+                default=0.0,
+                minval=0.0
+            ),
+            field.FieldInt(
+                'segment_length',
+                'Segment length (samples)',
+                default=256,
+                minval=8
+            ),
+            field.FieldFloat(
+                'overlap',
+                'Segment overlap (fraction)',
+                default=0.5,
+                minval=0.0,
+                maxval=0.95
+            ),
+            field.FieldCombo(
+                'window',
+                'Window',
+                default='hann',
+                items=SPECTRAL_WINDOWS,
+                editable=False
+            ),
+            field.FieldBool(
+                'spectrogram',
+                'Also create spectrogram 2D datasets',
+                default=False
+            ),
+            field.FieldText(
+                'frequency_output',
+                'Output frequency dataset name',
+                default='psd_frequency'
+            ),
+            field.FieldText(
+                'output_suffix',
+                'Output dataset suffix',
+                default='_psd_dB'
+            ),
+        ]
+
+    def getDatasets(self, fields):
+        """Define output datasets."""
+        input_names = [n for n in fields['input_datasets'] if n.strip()]
+        if not input_names:
+            raise DatasetPluginException("No input datasets selected")
+        if not fields['frequency_output'].strip():
+            raise DatasetPluginException(
+                "Frequency dataset name cannot be empty")
+
+        suffix = fields['output_suffix']
+        self.freq_output = Dataset1D(fields['frequency_output'])
+        self.psd_outputs = [Dataset1D(f"{name}{suffix}")
+                            for name in input_names]
+        self.spectrogram_outputs = []
+        if fields['spectrogram']:
+            self.spectrogram_outputs = [
+                Dataset2D(f"{name}{suffix}_spectrogram")
+                for name in input_names]
+
+        return ([self.freq_output] + self.psd_outputs
+                + self.spectrogram_outputs)
+
+    def updateDatasets(self, fields, helper):
+        """Compute the PSDs."""
+        input_names = [n for n in fields['input_datasets'] if n.strip()]
+
+        try:
+            input_datasets = helper.getDatasets(input_names, dimensions=1)
+        except Exception as e:
+            raise DatasetPluginException(
+                f"Error getting input datasets: {str(e)}")
+
+        t0 = 0.0
+        fs = fields['sample_rate']
+        if fs <= 0 or fields['spectrogram']:
+            try:
+                times = helper.getDataset(
+                    fields['time_dataset'], dimensions=1).data
+            except Exception as e:
+                if fs <= 0:
+                    raise DatasetPluginException(
+                        f"Error getting time dataset: {str(e)}")
+            else:
+                if fs <= 0:
+                    fs = self.sample_rate(times)
+                if len(times):
+                    t0 = float(times[0])
+
+        block = self.stack_channels(
+            [np.asarray(ds.data, dtype=np.float64) for ds in input_datasets])
+        nperseg = fields['segment_length']
+        if block.shape[1] < nperseg:
+            raise DatasetPluginException(
+                f"Channels are shorter than the segment length ({nperseg})")
+        noverlap = min(int(round(fields['overlap'] * nperseg)), nperseg - 1)
+
+        freqs, density, starts = self.welch_segments(
+            block, fs, nperseg, noverlap, fields['window'])
+
+        self.freq_output.update(data=freqs)
+        for output, psd in zip(self.psd_outputs, density.mean(axis=1)):
+            output.update(data=self.power_db(psd))
+
+        if self.spectrogram_outputs:
+            # Columns are segments (time), rows are frequencies
+            centres = t0 + (starts + 0.5 * nperseg) / fs
+            half_step = 0.5 * (nperseg - noverlap) / fs
+            half_df = 0.5 * fs / nperseg
+            for output, segments in zip(self.spectrogram_outputs, density):
+                output.update(
+                    data=self.power_db(segments.T),
+                    rangex=(centres[0] - half_step, centres[-1] + half_step),
+                    rangey=(freqs[0] - half_df, freqs[-1] + half_df))
+
+
+class CorrelationMatrixPlugin(_TelemetryMath, DatasetPlugin):
+    """Dataset plugin correlating all channels that carry a tag."""
+
+    # Plugin metadata
+    menu = ("Telemetry", "Correlation Matrix by Tag")
+    name = "Telemetry_Correlation_Matrix"
+    author = "William W. Wallace"
+    description_short = "Correlation matrix of all datasets with a tag"
+    description_full = (
+        "Stacks every 1D dataset carrying the given tag (e.g. Voltages) "
+        "and computes the Pearson or Spearman correlation matrix with one "
+        "np.corrcoef, as a 2D dataset for an image plot. Samples where any "
+        "channel is NaN are left out. Optionally computes the lagged "
+        "cross-correlation of every channel with a reference channel via "
+        "FFT. Channel order is given in the <output>_channels dataset."
+    )
+
+    def __init__(self):
+        """Define input fields for the plugin."""
+        self.fields = [
+            field.FieldText(
+                'tag',
+                'Tag of the channels to correlate',
+                default='Voltages'
+            ),
+            field.FieldCombo(
+                'method',
+                'Correlation',
+                default='Pearson',
+                items=('Pearson', 'Spearman'),
+                editable=False
+            ),
+            field.FieldText(
+                'output_name',
+                'Output dataset name',
+                default='corr_matrix'
+            ),
+            field.FieldInt(
+                'max_lag',
+                'Lagged cross-correlation: max lag in samples (0 = off)',
+                default=0,
+                minval=0
+            ),
+            field.FieldText(
+                'reference_dataset',
+                'Lagged cross-correlation: reference channel '
+                '(blank = first channel)',
+                default=''
+            ),
+        ]
+
+    def getDatasets(self, fields):
+        """Define output datasets."""
+        name = fields['output_name'].strip()
+        if not name:
+            raise DatasetPluginException("Output dataset name cannot be empty")
+
+        self.matrix_output = Dataset2D(name)
+        self.channels_output = DatasetText(f"{name}_channels")
+        outputs = [self.matrix_output, self.channels_output]
+
+        self.lagged_output = self.lags_output = None
+        if fields['max_lag'] > 0:
+            self.lagged_output = Dataset2D(f"{name}_lagged")
+            self.lags_output = Dataset1D(f"{name}_lags")
+            outputs += [self.lagged_output, self.lags_output]
+        return outputs
+
+    def updateDatasets(self, fields, helper):
+        """Compute the correlation matrix."""
+        tag = fields['tag'].strip()
+        if not tag:
+            raise DatasetPluginException("No tag given")
+
+        names = sorted(
+            name for name in helper.datasets1d
+            if tag in (helper._doc.data[name].tags or ()))
+        if len(names) < 2:
+            raise DatasetPluginException(
+                f"Need at least two datasets tagged '{tag}'")
+
+        try:
+            arrays = [np.asarray(ds.data, dtype=np.float64)
+                      for ds in helper.getDatasets(names, dimensions=1)]
+        except Exception as e:
+            raise DatasetPluginException(
+                f"Error getting input datasets: {str(e)}")
+
+        # Common length, then drop samples where any channel is NaN
+        n = min(len(a) for a in arrays)
+        block = np.vstack([a[:n] for a in arrays])
+        block = block[:, np.isfinite(block).all(axis=0)]
+        if block.shape[1] < 2:
+            raise DatasetPluginException("Not enough samples without NaNs")
+
+        if fields['method'] == 'Spearman':
+            ranked = np.vstack([self.average_ranks(row) for row in block])
+        else:
+            ranked = block
+        with np.errstate(invalid='ignore', divide='ignore'):
+            matrix = np.corrcoef(ranked)
+
+        nch = len(names)
+        self.matrix_output.update(
+            data=matrix, rangex=(-0.5, nch - 0.5), rangey=(-0.5, nch - 0.5))
+        self.channels_output.update(data=names)
+
+        if self.lagged_output is not None:
+            max_lag = min(fields['max_lag'], block.shape[1] - 1)
+            reference = fields['reference_dataset'].strip() or names[0]
+            if reference in names:
+                ref_values = block[names.index(reference)]
+            else:
+                raise DatasetPluginException(
+                    f"Reference '{reference}' is not tagged '{tag}'")
+
+            self.lagged_output.update(
+                data=self.lagged_xcorr(block, ref_values, max_lag),
+                rangex=(-max_lag - 0.5, max_lag + 0.5),
+                rangey=(-0.5, nch - 0.5))
+            self.lags_output.update(
+                data=np.arange(-max_lag, max_lag + 1, dtype=np.float64))
+
+
+# ----------------------------------------------------------------------
+# REGISTER PLUGINS
+# ----------------------------------------------------------------------
+datasetpluginregistry.append(RollingStatisticsPlugin)
+datasetpluginregistry.append(WelchPSDPlugin)
+datasetpluginregistry.append(CorrelationMatrixPlugin)
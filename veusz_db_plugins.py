@@ -10,6 +10,12 @@ Author: William W. Wallace
 """
 
 # %% Module Import
+import os
+import weakref
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from statistics import NormalDist
+
 import numpy as np
 # import veusz.plugins as plugins
 from veusz.plugins.datasetplugin import (
@@ -20,6 +26,55 @@ from veusz.plugins.datasetplugin import (
 from veusz.plugins import (field)
 import re
 
+# Upper bound on automatically chosen worker threads for by-tag averaging
+MAX_TAG_WORKERS = 8
+
+# How dBLinearAvgPlugin lines traces up before averaging: by sample index,
+# or by interpolating onto a common frequency grid
+FREQ_ALIGNMENTS = ('Index', 'Union', 'Intersection', 'Specified')
+
+# dB conventions: unit -> (factor, linear reference), so that
+# dB = factor*log10(linear/reference)
+DB_UNITS = {
+    'dB (voltage, 20log10)': (20.0, 1.0),
+    'dB (power, 10log10)': (10.0, 1.0),
+    'dBm / W': (10.0, 1e-3),
+    'dBW / W': (10.0, 1.0),
+    'dBm/Hz / W/Hz': (10.0, 1e-3),
+    'dBV / V': (20.0, 1.0),
+    'dBmV / V': (20.0, 1e-3),
+    'dBuV / V': (20.0, 1e-6),
+    'dBuA / A': (20.0, 1e-6),
+}
+DEFAULT_DB_UNIT = 'dB (voltage, 20log10)'
+
+# Per unit (factor, ln(10)/factor, ln(reference)): every conversion is
+# linear = exp(dB*scale + offset) and dB = (ln(linear) - offset)/scale
+_DB_COEFFS = {
+    unit: (factor, np.log(10.0) / factor, np.log(reference))
+    for unit, (factor, reference) in DB_UNITS.items()
+}
+
+# Linear-domain aggregations offered by the averaging plugins
+AGGREGATIONS = (
+    'Mean', 'Median', 'Trimmed mean', 'Percentile bands',
+    'Sigma-clipped mean', 'Log-sum-exp mean'
+)
+
+# Quantiles reported by the 'Percentile bands' aggregation (P5/P50/P95)
+PERCENTILE_BANDS = (0.05, 0.5, 0.95)
+
+# Spread of the traces reported as error bars on mean averages
+ERROR_BARS = (
+    'None', 'Std deviation', 'Standard error', 'Confidence interval'
+)
+
+# Input pairings accepted by the vector average
+VECTOR_FORMATS = ('Real/Imag', 'dB/Phase (deg)', 'Linear/Phase (deg)')
+
+# Interpolation indices kept per (frequency axis, grid) pair
+INTERP_CACHE_SIZE = 64
+
 
 # %% Class Definitions
 
@@ -37,7 +92,9 @@ class dBLinearAvgPlugin(DatasetPlugin):
         "computes their average in linear domain, then provides "
         "both linear magnitude and dB averaged outputs. "
         "This is the correct way to average magnitude data "
-        "expressed in dB."
+        "expressed in dB. Traces on different sweep grids can be "
+        "interpolated onto the union or intersection of their frequency "
+        "points, or onto a specified grid, before averaging."
     )
 
     def __init__(self):
@@ -61,8 +118,72 @@ class dBLinearAvgPlugin(DatasetPlugin):
                 'output_suffix',
                 'Output dataset suffix',
                 default='_avg'
+            ),
+            field.FieldCombo(
+                'unit',
+                'dB unit',
+                items=tuple(DB_UNITS),
+                editable=False,
+                default=DEFAULT_DB_UNIT
+            ),
+            field.FieldCombo(
+                'aggregation',
+                'Aggregation',
+                items=AGGREGATIONS,
+                editable=False,
+                default='Mean'
+            ),
+            field.FieldFloat(
+                'trim_fraction',
+                'Trimmed mean: fraction cut from each end',
+                default=0.1,
+                minval=0.0,
+                maxval=0.49
+            ),
+            field.FieldFloat(
+                'clip_sigma',
+                'Sigma-clipped mean: clip at N sigma',
+                default=3.0,
+                minval=0.1
+            ),
+            field.FieldCombo(
+                'error_bars',
+                'Error bars (mean aggregations)',
+                items=ERROR_BARS,
+                editable=False,
+                default='None'
+            ),
+            field.FieldFloat(
+                'confidence',
+                'Confidence level',
+                default=0.95,
+                minval=0.5,
+                maxval=0.9999
+            ),
+            field.FieldCombo(
+                'freq_alignment',
+                'Frequency alignment',
+                items=FREQ_ALIGNMENTS,
+                editable=False,
+                default='Index'
+            ),
+            field.FieldDatasetMulti(
+                'freq_datasets',
+                'Frequency datasets (one per input)'
+            ),
+            field.FieldDataset(
+                'freq_grid',
+                'Specified frequency grid'
             )
         ]
+        # Running linear sum/count kept between updates
+        self._state = _RunningAverage()
+        # (frequency axis, grid) fingerprints -> interpolation index
+        self._interp_cache = {}
+        # id(frequency array) -> (array, fingerprint) for current inputs,
+        # valid for one document changeset
+        self._axis_keys = {}
+        self._axis_changeset = None
 
     def getDatasets(self, fields):
         """Define output datasets."""
@@ -77,8 +198,14 @@ class dBLinearAvgPlugin(DatasetPlugin):
         self.linear_output = Dataset1D(
             f"{prefix}{base_name}_linear_mag{suffix}")
         self.db_output = Dataset1D(f"{prefix}{base_name}_dB{suffix}")
+        outputs = [self.linear_output, self.db_output]
 
-        return [self.linear_output, self.db_output]
+        # Aligned averages are on their own frequency grid
+        if fields.get('freq_alignment', 'Index') != 'Index':
+            self.freq_output = Dataset1D(f"{prefix}{base_name}_freq{suffix}")
+            outputs.append(self.freq_output)
+
+        return outputs
 
     def updateDatasets(self, fields, helper):
         """Compute averaged datasets."""
@@ -88,61 +215,190 @@ class dBLinearAvgPlugin(DatasetPlugin):
             raise DatasetPluginException("No input datasets selected")
 
         # Get input datasets
+        inputs = {}
         try:
-            input_datasets = helper.getDatasets(input_names, dimensions=1)
+            for name in input_names:
+                data = _RunningAverage.document_data(helper, name)
+                if data is not None and len(data) > 0:
+                    inputs[name] = data
         except Exception as e:
             raise DatasetPluginException(
                 f"Error getting input datasets: {str(e)}")
 
-        if len(input_datasets) == 0:
-            raise DatasetPluginException("No valid input datasets found")
-
-        # Convert all dB datasets to linear magnitude
-        linear_data = []
-        for dataset in input_datasets:
-            if dataset.data is None or len(dataset.data) == 0:
-                continue
-
-            # Convert dB to linear magnitude: linear = 10^(dB/20)
-            linear_mag = 10.0 ** (dataset.data / 20.0)
-            linear_data.append(linear_mag)
-
-        if not linear_data:
+        if not inputs:
             raise DatasetPluginException("No valid data to process")
 
-        # Find the maximum length among all datasets
-        max_length = max(len(data) for data in linear_data)
-
-        # Pad shorter datasets with NaN to handle different lengths
-        # required to create a data_matrix by np.array
-        padded_data = []
-        for data in linear_data:
-            if len(data) < max_length:
-                padded = np.full(max_length, np.nan)
-                padded[:len(data)] = data
-                padded_data.append(padded)
-            else:
-                padded_data.append(data)
+        # Only inputs added, removed or modified since the last update are
+        # converted to linear for the selected unit (see DB_UNITS) and
+        # added to / subtracted from the running sums
+        unit = fields.get('unit', DEFAULT_DB_UNIT)
+        alignment = fields.get('freq_alignment', 'Index')
+        if fields.get('aggregation') == 'Log-sum-exp mean':
+            # Averaged in the dB domain straight from the inputs
+            if alignment != 'Index':
+                raise DatasetPluginException(
+                    "Log-sum-exp mean needs Index frequency alignment")
+            linear_kw, db_kw = _MathHelpers.logsumexp_outputs(
+                list(inputs.values()), unit, fields)
+            self.linear_output.update(**linear_kw)
+            self.db_output.update(**db_kw)
+            return
+
+        changeset = _RunningAverage.document_changeset(helper)
+        if alignment == 'Index':
+            self._state.update(
+                inputs,
+                convert=lambda values: _MathHelpers.linear_rows(values, unit),
+                key=unit, changeset=changeset)
+        else:
+            inputs, grid = self.frequency_inputs(fields, helper, inputs)
+            grid_key = _RunningAverage.fingerprint(grid)
+            self._state.update(
+                inputs,
+                convert=lambda values: self.interpolate_rows(
+                    values, grid, grid_key, unit),
+                key=(alignment, grid_key, unit), changeset=changeset)
+            self.freq_output.update(data=grid)
+
+        # Back to dB with the same unit conversion (_MathHelpers.db_from_lin)
+        linear_kw, db_kw = _MathHelpers.aggregate_outputs(
+            *self._state.aggregate(fields), unit=unit)
 
-        # Convert to matrix for averaging
-        data_matrix = np.array(padded_data)
-
-        # Compute average in linear domain (ignoring NaN values)
-        with np.errstate(invalid='ignore', divide='ignore'):
-            avg_linear = np.nanmean(data_matrix, axis=0)
+        # Update output datasets
+        self.linear_output.update(**linear_kw)
+        self.db_output.update(**db_kw)
 
-        # Convert back to dB: dB = 20*log10(linear)
-        with np.errstate(invalid='ignore', divide='ignore'):
-            avg_db = 20.0 * np.log10(avg_linear)
+    def frequency_inputs(self, fields, helper, inputs):
+        """
+        Pair each input with its frequency dataset and build the grid.
 
-        # Handle any infinite or invalid values
-        # TODO: Look at placing np.nan...
-        avg_linear = np.where(np.isfinite(avg_linear), avg_linear, np.nan)
-        avg_db = np.where(np.isfinite(avg_db), avg_db, np.nan)
+        Returns ({name: (dB data, frequency)}, grid). Union uses every
+        distinct frequency point, Intersection only those inside the span
+        covered by all traces, Specified the points of the grid dataset.
+        """
+        input_names = fields['input_datasets']
+        freq_names = fields.get('freq_datasets') or []
+        if len(freq_names) != len(input_names):
+            raise DatasetPluginException(
+                "Select one frequency dataset per input dataset")
 
-        # Update output datasets
-        self.linear_output.update(data=avg_linear)
-        self.db_output.update(data=avg_db)
+        paired = {}
+        for name, freq_name in zip(input_names, freq_names):
+            if name not in inputs:
+                continue
+            try:
+                freq = _RunningAverage.document_data(helper, freq_name)
+            except Exception as e:
+                raise DatasetPluginException(
+                    f"Error getting frequency dataset: {str(e)}")
+            if freq is None:
+                raise DatasetPluginException(
+                    f"Frequency dataset '{freq_name}' is empty")
+            data = inputs[name]
+            n = min(len(data), len(freq))
+            if n < 2:
+                raise DatasetPluginException(
+                    f"'{name}' needs at least two frequency points")
+            # Only slice when needed so axes keep their identity (axis_key)
+            paired[name] = (data if n == len(data) else data[:n],
+                            freq if n == len(freq) else freq[:n])
+
+        # Axes may have been edited in place since they were fingerprinted
+        changeset = _RunningAverage.document_changeset(helper)
+        if changeset is None or changeset != self._axis_changeset:
+            self._axis_keys = {}
+            self._axis_changeset = changeset
+        current = {id(freq) for _, freq in paired.values()}
+        self._axis_keys = {key: entry for key, entry in self._axis_keys.items()
+                           if key in current}
+
+        if fields['freq_alignment'] == 'Specified':
+            try:
+                grid = helper.getDataset(fields['freq_grid'], dimensions=1).data
+            except Exception as e:
+                raise DatasetPluginException(
+                    f"Error getting frequency grid: {str(e)}")
+            grid = np.asarray(grid if grid is not None else [], dtype=float)
+            grid = np.unique(grid[np.isfinite(grid)])
+        else:
+            # Sweeps are usually shared, so only distinct axes are merged
+            freqs = {self.axis_key(freq): freq for _, freq in paired.values()}
+            grid = np.unique(np.concatenate(list(freqs.values())))
+            grid = grid[np.isfinite(grid)]
+            if fields['freq_alignment'] == 'Intersection':
+                low = max(np.nanmin(freq) for freq in freqs.values())
+                high = min(np.nanmax(freq) for freq in freqs.values())
+                grid = grid[(grid >= low) & (grid <= high)]
+
+        if len(grid) == 0:
+            raise DatasetPluginException("Frequency grid is empty")
+        return paired, grid
+
+    def axis_key(self, freq):
+        """
+        Fingerprint of a frequency array, hashed once per array object
+        and document changeset.
+        """
+        entry = self._axis_keys.get(id(freq))
+        if entry is None or entry[0] is not freq:
+            entry = self._axis_keys[id(freq)] = (
+                freq, _RunningAverage.fingerprint(freq))
+        return entry[1]
+
+    def interpolation_index(self, freq, grid, grid_key):
+        """
+        Cached (order, lower index, weight, outside mask) for interpolating
+        samples on freq onto grid.
+        """
+        key = (self.axis_key(freq), grid_key)
+        cached = self._interp_cache.get(key)
+        if cached is not None:
+            return cached
+
+        order = None
+        if np.any(np.diff(freq) <= 0):
+            order = np.argsort(freq, kind='stable')
+            freq = freq[order]
+        lower = np.searchsorted(freq, grid, side='right') - 1
+        np.clip(lower, 0, len(freq) - 2, out=lower)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weight = (grid - freq[lower]) / (freq[lower + 1] - freq[lower])
+        weight[~np.isfinite(weight)] = 0.0
+        outside = (grid < freq[0]) | (grid > freq[-1])
+
+        if len(self._interp_cache) >= INTERP_CACHE_SIZE:
+            del self._interp_cache[next(iter(self._interp_cache))]
+        cached = self._interp_cache[key] = (order, lower, weight, outside)
+        return cached
+
+    def interpolate_rows(self, values, grid, grid_key,
+                         unit=DEFAULT_DB_UNIT):
+        """
+        Linear rows of (dB data, frequency) pairs interpolated onto grid.
+
+        Traces sharing a frequency axis are converted and interpolated as
+        one block; points outside a trace's sweep are NaN.
+        """
+        buf = np.empty((len(values), len(grid)))
+        groups = {}
+        for i, (_, freq) in enumerate(values):
+            groups.setdefault(self.axis_key(freq), []).append(i)
+
+        for members in groups.values():
+            order, lower, weight, outside = self.interpolation_index(
+                values[members[0]][1], grid, grid_key)
+            block = _MathHelpers.linear_stack(
+                [values[i][0] for i in members], unit)
+            if order is not None:
+                block = block[:, order]
+            low = block[:, lower]
+            high = block[:, lower + 1]
+            high -= low
+            high *= weight
+            high += low
+            high[:, outside] = np.nan
+            buf[members] = high
+        return list(buf)
 
 
 class dBToLinearPlugin(DatasetPlugin):
@@ -154,7 +410,8 @@ class dBToLinearPlugin(DatasetPlugin):
     description_short = "Convert dB dataset to linear magnitude"
     description_full = (
         "Converts a dB magnitude dataset to linear magnitude "
-        "using the formula: linear = 10^(dB/20)"
+        "using the formula: linear = 10^(dB/20), or the power / "
+        "absolute-unit form selected (e.g. dBm to W)"
     )
 
     def __init__(self):
@@ -168,6 +425,13 @@ class dBToLinearPlugin(DatasetPlugin):
                 'output_dataset',
                 'Output dataset name'
             ),
+            field.FieldCombo(
+                'unit',
+                'dB unit',
+                items=tuple(DB_UNITS),
+                editable=False,
+                default=DEFAULT_DB_UNIT
+            )
         ]
 
     def getDatasets(self, fields):
@@ -191,33 +455,16 @@ class dBToLinearPlugin(DatasetPlugin):
         if input_dataset.data is None or len(input_dataset.data) == 0:
             raise DatasetPluginException("Input dataset is empty")
 
-        # Convert dB to linear magnitude: linear = 10^(dB/20)
-        linear_data = 10.0 ** (input_dataset.data / 20.0)
+        # Convert dB to linear for the selected unit (see DB_UNITS)
+        unit = fields.get('unit', DEFAULT_DB_UNIT)
+        linear_data = _MathHelpers.lin_from_db(input_dataset.data, unit)
 
         # Handle error bars if present
-        linear_serr = None
-        linear_perr = None
-        linear_nerr = None
-
-        if input_dataset.serr is not None:
-            # For symmetric errors in dB, convert to linear domain
-            # Error propagation: if y = 10^(x/20), then dy = y * ln(10)/20 * dx
-            conversion_factor = linear_data * np.log(10) / 20.0
-            linear_serr = conversion_factor * input_dataset.serr
-
-        if input_dataset.perr is not None:
-            conversion_factor = linear_data * np.log(10) / 20.0
-            linear_perr = conversion_factor * input_dataset.perr
-
-        if input_dataset.nerr is not None:
-            conversion_factor = linear_data * np.log(10) / 20.0
-            linear_nerr = conversion_factor * input_dataset.nerr
-
         self.output.update(
             data=linear_data,
-            serr=linear_serr,
-            perr=linear_perr,
-            nerr=linear_nerr
+            serr=_MathHelpers.lin_error(linear_data, input_dataset.serr, unit),
+            perr=_MathHelpers.lin_error(linear_data, input_dataset.perr, unit),
+            nerr=_MathHelpers.lin_error(linear_data, input_dataset.nerr, unit)
         )
 
 
@@ -230,7 +477,8 @@ class LinearTodBPlugin(DatasetPlugin):
     description_short = "Convert linear magnitude to dB"
     description_full = (
         "Converts a linear magnitude dataset to dB "
-        "using the formula: dB = 20*log10(linear)"
+        "using the formula: dB = 20*log10(linear), or the power / "
+        "absolute-unit form selected (e.g. W to dBm)"
     )
 
     def __init__(self):
@@ -244,6 +492,13 @@ class LinearTodBPlugin(DatasetPlugin):
                 'output_dataset',
                 'Output dataset name'
             ),
+            field.FieldCombo(
+                'unit',
+                'dB unit',
+                items=tuple(DB_UNITS),
+                editable=False,
+                default=DEFAULT_DB_UNIT
+            )
         ]
 
     def getDatasets(self, fields):
@@ -267,45 +522,143 @@ class LinearTodBPlugin(DatasetPlugin):
         if input_dataset.data is None or len(input_dataset.data) == 0:
             raise DatasetPluginException("Input dataset is empty")
 
-        # Convert linear to dB: dB = 20*log10(linear)
-        # Handle zero and negative values
-        with np.errstate(invalid='ignore', divide='ignore'):
-            db_data = 20.0 * np.log10(np.abs(input_dataset.data))
-
-        # Replace infinite values with a NaN
-        db_data = np.where(np.isfinite(db_data), db_data, np.nan)
+        # Convert linear to dB for the selected unit (see DB_UNITS)
+        # Handle zero and negative values; infinite values become NaN
+        unit = fields.get('unit', DEFAULT_DB_UNIT)
+        linear_data = np.abs(input_dataset.data)
+        db_data = _MathHelpers.db_from_lin(linear_data, unit)
 
         # Handle error bars if present
-        db_serr = None
-        db_perr = None
-        db_nerr = None
-
-        # TODO: Test this!
-        if input_dataset.serr is not None:
-            # Error propagation: if y = 20*log10(x), then dy = 20/(x*ln(10)) * dx
-            conversion_factor = 20.0 / (input_dataset.data * np.log(10))
-            conversion_factor = np.where(np.isfinite(conversion_factor), conversion_factor, 0.0)
-            db_serr = np.abs(conversion_factor * input_dataset.serr)
-
-        if input_dataset.perr is not None:
-            conversion_factor = 20.0 / (input_dataset.data * np.log(10))
-            conversion_factor = np.where(np.isfinite(conversion_factor), conversion_factor, 0.0)
-            db_perr = np.abs(conversion_factor * input_dataset.perr)
-
-        if input_dataset.nerr is not None:
-            conversion_factor = 20.0 / (input_dataset.data * np.log(10))
-            conversion_factor = np.where(np.isfinite(conversion_factor), conversion_factor, 0.0)
-            db_nerr = -np.abs(conversion_factor * input_dataset.nerr)
-
+        db_nerr = _MathHelpers.db_error(linear_data, input_dataset.nerr, unit)
         self.output.update(
             data=db_data,
-            serr=db_serr,
-            perr=db_perr,
-            nerr=db_nerr
+            serr=_MathHelpers.db_error(linear_data, input_dataset.serr, unit),
+            perr=_MathHelpers.db_error(linear_data, input_dataset.perr, unit),
+            nerr=None if db_nerr is None else -db_nerr
         )
 
 
 
+class VectorAvgPlugin(DatasetPlugin):
+    """Dataset plugin to average complex (S-parameter) traces."""
+
+    menu = ("Signal Processing", "Vector Average")
+    name = "Vector_Average"
+    author = "William W. Wallace"
+    description_short = "Average complex traces coherently"
+    description_full = (
+        "Averages paired real/imaginary or magnitude/phase datasets as "
+        "complex numbers, so phase is taken into account, and outputs the "
+        "magnitude of the mean in dB, its phase in degrees, and the "
+        "coherence |mean(x)| / mean(|x|), which is 1 where all traces "
+        "agree in phase."
+    )
+
+    def __init__(self):
+        """Define input fields for the plugin."""
+        self.fields = [
+            field.FieldCombo(
+                'input_format',
+                'Input format',
+                items=VECTOR_FORMATS,
+                editable=False,
+                default='Real/Imag'
+            ),
+            field.FieldDatasetMulti(
+                'first_datasets',
+                'Real or magnitude datasets'
+            ),
+            field.FieldDatasetMulti(
+                'second_datasets',
+                'Imaginary or phase datasets (same order)'
+            ),
+            field.FieldCombo(
+                'unit',
+                'dB unit',
+                items=tuple(DB_UNITS),
+                editable=False,
+                default=DEFAULT_DB_UNIT
+            ),
+            field.FieldText(
+                'output_prefix',
+                'Output dataset prefix',
+                default='avg_'
+            ),
+            field.FieldText(
+                'base_name',
+                'Output dataset base name',
+                default='vec'
+            ),
+            field.FieldText(
+                'output_suffix',
+                'Output dataset suffix',
+                default='_avg'
+            )
+        ]
+
+    def getDatasets(self, fields):
+        """Define output datasets."""
+        prefix = fields['output_prefix']
+        suffix = fields['output_suffix']
+        base_name = fields['base_name']
+        if not prefix.strip() and not suffix.strip() and not base_name.strip():
+            raise DatasetPluginException(
+                "Output prefix, base name, AND suffix cannot be empty")
+
+        self.db_output = Dataset1D(f"{prefix}{base_name}_mag_dB{suffix}")
+        self.phase_output = Dataset1D(
+            f"{prefix}{base_name}_phase_deg{suffix}")
+        self.coherence_output = Dataset1D(
+            f"{prefix}{base_name}_coherence{suffix}")
+
+        return [self.db_output, self.phase_output, self.coherence_output]
+
+    def updateDatasets(self, fields, helper):
+        """Compute the vector average."""
+        first_names = fields['first_datasets']
+        second_names = fields['second_datasets']
+
+        if not first_names:
+            raise DatasetPluginException("No input datasets selected")
+        if len(first_names) != len(second_names):
+            raise DatasetPluginException(
+                "Select the same number of datasets in both lists")
+
+        try:
+            firsts = helper.getDatasets(first_names, dimensions=1)
+            seconds = helper.getDatasets(second_names, dimensions=1)
+        except Exception as e:
+            raise DatasetPluginException(
+                f"Error getting input datasets: {str(e)}")
+
+        pairs = []
+        for first, second in zip(firsts, seconds):
+            if first.data is None or second.data is None:
+                continue
+            n = min(len(first.data), len(second.data))
+            if n > 0:
+                pairs.append((np.asarray(first.data[:n], dtype=float),
+                              np.asarray(second.data[:n], dtype=float)))
+        if not pairs:
+            raise DatasetPluginException("No valid data to process")
+
+        unit = fields.get('unit', DEFAULT_DB_UNIT)
+        total, abs_total, count = _MathHelpers.vector_sums(
+            pairs, fields.get('input_format', 'Real/Imag'), unit)
+
+        valid = count > 0
+        mean = np.full(len(total), np.nan, dtype=complex)
+        mean[valid] = total[valid] / count[valid]
+        magnitude = np.abs(mean)
+        coherence = np.full(len(total), np.nan)
+        np.divide(np.abs(total), abs_total, out=coherence,
+                  where=valid & (abs_total > 0))
+
+        self.db_output.update(data=_MathHelpers.db_from_lin(magnitude, unit))
+        self.phase_output.update(data=np.degrees(np.angle(mean)))
+        self.coherence_output.update(data=coherence)
+
+
 # ============================================================================
 # NEW PLUGINS: Process By Tag
 # ============================================================================
@@ -327,14 +680,51 @@ class _MathHelpers:
     """Static helpers for dB / linear conversions and averaging."""
 
     @staticmethod
-    def lin_from_db(arr):
-        return 10.0 ** (arr / 20.0)
+    def lin_from_db(arr, unit=DEFAULT_DB_UNIT, out=None):
+        """linear = reference * 10^(dB/factor), in place if out is given."""
+        _, scale, offset = _DB_COEFFS[unit]
+        out = np.multiply(arr, scale, out=out)
+        if offset:
+            np.add(out, offset, out=out)
+        return np.exp(out, out=out)
 
     @staticmethod
-    def db_from_lin(arr):
+    def db_from_lin(arr, unit=DEFAULT_DB_UNIT, out=None):
+        """dB = factor*log10(linear/reference); non-finite results are NaN."""
+        _, scale, offset = _DB_COEFFS[unit]
         with np.errstate(invalid='ignore', divide='ignore'):
-            out = 20.0 * np.log10(arr)
-        return np.where(np.isfinite(out), out, np.nan)
+            out = np.log(arr, out=out)
+        if offset:
+            np.subtract(out, offset, out=out)
+        np.divide(out, scale, out=out)
+        out[~np.isfinite(out)] = np.nan
+        return out
+
+    @staticmethod
+    def lin_error(linear, err, unit=DEFAULT_DB_UNIT):
+        """
+        Propagate a dB error bar to the linear domain.
+
+        If y = ref*10^(x/factor), then dy = y * ln(10)/factor * dx.
+        """
+        if err is None:
+            return None
+        return linear * _DB_COEFFS[unit][1] * err
+
+    @staticmethod
+    def db_error(linear, err, unit=DEFAULT_DB_UNIT):
+        """
+        Propagate a linear error bar to dB, returned as a magnitude.
+
+        If y = factor*log10(x/ref), then dy = factor/(x*ln(10)) * dx.
+        """
+        if err is None:
+            return None
+        with np.errstate(invalid='ignore', divide='ignore'):
+            conversion_factor = 1.0 / (linear * _DB_COEFFS[unit][1])
+        conversion_factor = np.where(
+            np.isfinite(conversion_factor), conversion_factor, 0.0)
+        return np.abs(conversion_factor * err)
 
     @staticmethod
     def pad(arr, N):
@@ -344,11 +734,673 @@ class _MathHelpers:
             return tmp
         return arr
 
+    @staticmethod
+    def linear_stack(arrays, unit=DEFAULT_DB_UNIT):
+        """
+        Convert dB arrays into one NaN-padded (n, max_len) linear buffer.
+
+        Each input is written straight into its own row, so the buffer is
+        the only full-size allocation.
+        """
+        max_len = max(len(arr) for arr in arrays)
+        buf = np.full((len(arrays), max_len), np.nan)
+        for row, arr in zip(buf, arrays):
+            _MathHelpers.lin_from_db(arr, unit, out=row[:len(arr)])
+        return buf
+
+    @staticmethod
+    def linear_rows(arrays, unit=DEFAULT_DB_UNIT):
+        """linear_stack() rows trimmed back to each input's own length."""
+        buf = _MathHelpers.linear_stack(arrays, unit)
+        return [row[:len(arr)] for row, arr in zip(buf, arrays)]
+
+    @staticmethod
+    def stack_moments(rows):
+        """
+        Column mean, sum of squared deviations (M2) and count of the
+        finite entries of (ragged) rows.
+
+        Two passes (sums, then deviations from the mean) so M2 does not
+        suffer the cancellation of sum(x**2) - sum(x)**2/n.
+        """
+        length = max((len(row) for row in rows), default=0)
+        mean = np.zeros(length)
+        m2 = np.zeros(length)
+        count = np.zeros(length, dtype=np.int64)
+        valid = np.empty(length, dtype=bool)
+        delta = np.empty(length)
+        for row in rows:
+            n = len(row)
+            np.isfinite(row, out=valid[:n])
+            np.add(mean[:n], row, out=mean[:n], where=valid[:n])
+            count[:n] += valid[:n]
+        np.divide(mean, count, out=mean, where=count > 0)
+        for row in rows:
+            n = len(row)
+            np.isfinite(row, out=valid[:n])
+            np.subtract(row, mean[:n], out=delta[:n])
+            np.multiply(delta[:n], delta[:n], out=delta[:n])
+            np.add(m2[:n], delta[:n], out=m2[:n], where=valid[:n])
+        return mean, m2, count
+
+    @staticmethod
+    def rows_stack(rows):
+        """NaN-padded (n, max_len) buffer holding ragged rows."""
+        length = max((len(row) for row in rows), default=0)
+        buf = np.full((len(rows), length), np.nan)
+        for out, row in zip(buf, rows):
+            out[:len(row)] = row
+        return buf
+
+    @staticmethod
+    def _valid_groups(buf):
+        """
+        Yield (columns, k, block) for the columns of buf sharing the same
+        number k > 0 of finite entries. block is a copy of those columns
+        with the invalid entries set to +inf, so they select last.
+        """
+        valid = np.isfinite(buf)
+        counts = valid.sum(axis=0)
+        work = np.where(valid, buf, np.inf)
+        for k in np.unique(counts):
+            if k == 0:
+                continue
+            columns = np.flatnonzero(counts == k)
+            block = work if len(columns) == buf.shape[1] \
+                else work[:, columns]
+            yield columns, int(k), block
+
+    @staticmethod
+    def quantiles(buf, fractions):
+        """
+        Column quantiles of the finite entries of buf, interpolated like
+        np.percentile. Each valid-count group is partitioned once at all
+        the ranks needed, rather than sorted.
+
+        Returns a (len(fractions), n_columns) array.
+        """
+        fractions = np.asarray(fractions, dtype=float)
+        out = np.full((len(fractions), buf.shape[1]), np.nan)
+        for columns, k, block in _MathHelpers._valid_groups(buf):
+            position = fractions * (k - 1)
+            low = np.floor(position).astype(int)
+            high = np.minimum(low + 1, k - 1)
+            block = np.partition(
+                block, np.unique(np.concatenate([low, high])), axis=0)
+            frac = (position - low)[:, None]
+            out[:, columns] = block[low] * (1.0 - frac) + block[high] * frac
+        return out
+
+    @staticmethod
+    def trimmed_mean(buf, fraction):
+        """Column mean after dropping fraction of the entries at each end."""
+        out = np.full(buf.shape[1], np.nan)
+        for columns, k, block in _MathHelpers._valid_groups(buf):
+            cut = int(fraction * k)
+            # Partitioning at k-cut-1 also moves the +inf fillers of the
+            # missing entries past the slice, even when nothing is cut
+            block = np.partition(
+                block, sorted({cut, k - cut - 1}), axis=0)
+            out[columns] = block[cut:k - cut].mean(axis=0)
+        return out
+
+    @staticmethod
+    def sigma_clipped_mean(buf, nsigma, iterations=5):
+        """Column mean repeatedly excluding entries beyond nsigma std."""
+        valid = np.isfinite(buf)
+        data = np.where(valid, buf, 0.0)
+        keep = valid
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for _ in range(iterations):
+                count = keep.sum(axis=0)
+                mean = (data * keep).sum(axis=0) / count
+                dev = np.where(keep, data - mean, 0.0)
+                std = np.sqrt((dev * dev).sum(axis=0) / count)
+                clipped = valid & (np.abs(data - mean) <= nsigma * std)
+                if np.array_equal(clipped, keep):
+                    break
+                keep = clipped
+            count = keep.sum(axis=0)
+            return (data * keep).sum(axis=0) / count
+
+    @staticmethod
+    def aggregate_outputs(center, low=None, high=None, err=None,
+                          unit=DEFAULT_DB_UNIT):
+        """
+        Output values for the linear and dB datasets of an aggregation.
+
+        Percentile bands become asymmetric error bars around the median.
+        A symmetric linear error err becomes serr on the linear output and
+        the matching asymmetric perr/nerr in dB.
+        Returns (linear update kwargs, dB update kwargs).
+        """
+        center_db = _MathHelpers.db_from_lin(center, unit)
+        center = np.where(np.isfinite(center), center, np.nan)
+        linear_kw = {'data': center}
+        db_kw = {'data': center_db}
+        if low is not None:
+            linear_kw.update(perr=high - center, nerr=low - center)
+            db_kw.update(
+                perr=_MathHelpers.db_from_lin(high, unit) - center_db,
+                nerr=_MathHelpers.db_from_lin(low, unit) - center_db)
+        elif err is not None:
+            perr, nerr = _MathHelpers.db_bands(center, err, unit)
+            linear_kw['serr'] = err
+            db_kw.update(perr=perr, nerr=nerr)
+        return linear_kw, db_kw
+
+    @staticmethod
+    def db_bands(center, err, unit=DEFAULT_DB_UNIT):
+        """
+        dB error bars for center +/- err in linear units.
+
+        perr/nerr are the exact dB offsets of center+err and center-err.
+        Where center-err is not positive, nerr falls back to the first-order
+        db_error() propagation.
+        """
+        scale = _DB_COEFFS[unit][1]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rel = err / center
+            perr = np.log1p(rel) / scale
+            nerr = np.log1p(-rel) / scale
+        below = ~(rel < 1.0)
+        nerr[below] = -_MathHelpers.db_error(center, err, unit)[below]
+        return perr, nerr
+
+    @staticmethod
+    def t_quantile(p, dof):
+        """
+        Student-t quantile for probability p and (per-column) dof.
+
+        Exact for 1 and 2 degrees of freedom, otherwise Hill's (1970)
+        algorithm 396, within 2e-5 relative of the exact quantile for
+        confidence levels up to 0.9999. NaN where dof < 1.
+        """
+        dof = np.asarray(dof, dtype=float)
+        sign = 1.0 if p >= 0.5 else -1.0
+        tail = 2.0 * min(p, 1.0 - p)
+        x = NormalDist().inv_cdf(0.5 * tail)
+        with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+            a = 1.0 / (dof - 0.5)
+            b = 48.0 / (a * a)
+            c = ((20700.0 * a / b - 98.0) * a - 16.0) * a + 96.36
+            d = ((94.5 / (b + c) - 3.0) / b + 1.0) \
+                * np.sqrt(a * np.pi / 2.0) * dof
+            y = (d * tail) ** (2.0 / dof)
+
+            # Far tail: expansion about the normal deviate x
+            c = c + np.where(dof < 5, 0.3 * (dof - 4.5) * (x + 0.6), 0.0)
+            c = (((0.05 * d * x - 5.0) * x - 7.0) * x - 2.0) * x + b + c
+            far = (((((0.4 * x * x + 6.3) * x * x + 36.0) * x * x + 94.5)
+                    / c - x * x - 3.0) / b + 1.0) * x
+            far = np.expm1(a * far * far)
+            # Otherwise: series in the tail probability
+            near = (((1.0 / (((dof + 6.0) / (dof * y) - 0.089 * d - 0.822)
+                             * (dof + 2.0) * 3.0) + 0.5 / (dof + 4.0)) * y
+                     - 1.0) * (dof + 1.0) / (dof + 2.0) + 1.0 / y)
+            t = np.sqrt(dof * np.where(y > 0.05 + a, far, near))
+
+            t = np.where(dof == 1, np.tan(np.pi * abs(p - 0.5)), t)
+            t = np.where(dof == 2,
+                         abs(2 * p - 1) / np.sqrt(2 * p * (1 - p)), t)
+        return np.where(dof >= 1, sign * t, np.nan)
+
+    @staticmethod
+    def error_scale(std, count, fields):
+        """
+        Error bar half-width from the per-column std and count, as chosen
+        by the error_bars/confidence fields; None when disabled.
+        """
+        mode = fields.get('error_bars', 'None')
+        if mode == 'None':
+            return None
+        if mode == 'Std deviation':
+            return std
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sem = std / np.sqrt(count)
+        if mode == 'Standard error':
+            return sem
+        confidence = fields.get('confidence', 0.95)
+        return _MathHelpers.t_quantile(0.5 + confidence / 2.0, count - 1) * sem
+
+    @staticmethod
+    def logsumexp_moments(arrays, unit=DEFAULT_DB_UNIT, orders=(1,)):
+        """
+        ln E[(linear/reference)^k] per column for each k in orders,
+        computed without leaving the log domain.
+
+        With a = ln(linear/reference) = dB*scale, a running column maximum
+        m of k*a and sum s = sum(exp(k*a - m)) are updated trace by trace
+        (s is rescaled whenever m grows), so nothing under- or overflows
+        however large the dynamic range. A few scratch rows are reused for
+        every trace.
+
+        Returns ([ln moment per order], count); -inf where a moment is
+        exactly zero, NaN where a column has no valid value.
+        """
+        _, scale, _ = _DB_COEFFS[unit]
+        length = max(len(arr) for arr in arrays)
+        peaks = [np.full(length, -np.inf) for _ in orders]
+        totals = [np.zeros(length) for _ in orders]
+        count = np.zeros(length, dtype=np.int64)
+        scaled = np.empty(length)
+        powered = np.empty(length)
+        work = np.empty(length)
+        scratch = np.empty(length)
+        valid = np.empty(length, dtype=bool)
+        usable = np.empty(length, dtype=bool)
+
+        with np.errstate(invalid='ignore', over='ignore'):
+            for arr in arrays:
+                n = len(arr)
+                a, t, ok = scaled[:n], work[:n], valid[:n]
+                new_peak, keep = scratch[:n], usable[:n]
+                np.multiply(arr, scale, out=a)
+                # NaN and +inf dB have no finite linear value
+                np.less(a, np.inf, out=ok)
+
+                for k, peak, total in zip(orders, peaks, totals):
+                    ka = a if k == 1 else np.multiply(a, k, out=powered[:n])
+                    m, s = peak[:n], total[:n]
+                    np.copyto(new_peak, m)
+                    np.maximum(m, ka, out=new_peak, where=ok)
+                    # s *= exp(m - new_peak); NaN only while both are -inf
+                    np.subtract(m, new_peak, out=t)
+                    np.exp(t, out=t)
+                    np.isnan(t, out=keep)
+                    np.logical_not(keep, out=keep)
+                    np.multiply(s, t, out=s, where=keep)
+                    # s += exp(k*a - new_peak)
+                    np.subtract(ka, new_peak, out=t)
+                    np.exp(t, out=t)
+                    np.isnan(t, out=keep)
+                    np.logical_not(keep, out=keep)
+                    np.logical_and(keep, ok, out=keep)
+                    np.add(s, t, out=s, where=keep)
+                    np.copyto(m, new_peak)
+                count[:n] += ok
+
+        has = count > 0
+        moments = []
+        for peak, total in zip(peaks, totals):
+            moment = np.full(length, np.nan)
+            with np.errstate(divide='ignore'):
+                moment[has] = peak[has] + np.log(total[has] / count[has])
+            moments.append(moment)
+        return moments, count
+
+    @staticmethod
+    def logsumexp_mean(arrays, unit=DEFAULT_DB_UNIT):
+        """Linear-domain mean of dB arrays, returned in dB."""
+        (moment,), _ = _MathHelpers.logsumexp_moments(arrays, unit)
+        return moment / _DB_COEFFS[unit][1]
+
+    @staticmethod
+    def logsumexp_outputs(arrays, unit=DEFAULT_DB_UNIT, fields=None):
+        """
+        Linear and dB output values for a log-sum-exp mean.
+
+        Error bars use the relative spread std/mean, which only needs the
+        difference of the log moments and so stays finite at any level.
+        """
+        fields = fields or {}
+        scale = _DB_COEFFS[unit][1]
+        with_errors = fields.get('error_bars', 'None') != 'None'
+        moments, count = _MathHelpers.logsumexp_moments(
+            arrays, unit, (1, 2) if with_errors else (1,))
+        mean_db = moments[0] / scale
+        mean_linear = _MathHelpers.lin_from_db(mean_db, unit)
+        mean_linear[~np.isfinite(mean_linear)] = np.nan
+        linear_kw = {'data': mean_linear}
+        db_kw = {'data': mean_db}
+
+        if with_errors:
+            with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+                ratio = np.expm1(moments[1] - 2.0 * moments[0])
+                rel_std = np.sqrt(
+                    np.maximum(ratio, 0.0) * count / (count - 1.0))
+            rel_std[count < 2] = np.nan
+            rel = _MathHelpers.error_scale(rel_std, count, fields)
+            perr, nerr = _MathHelpers.db_bands(np.ones_like(rel), rel, unit)
+            linear_kw['serr'] = mean_linear * rel
+            db_kw.update(perr=perr, nerr=nerr)
+
+        mean_db[~np.isfinite(mean_db)] = np.nan
+        return linear_kw, db_kw
+
+    @staticmethod
+    def vector_sums(pairs, input_format, unit=DEFAULT_DB_UNIT):
+        """
+        Running complex sum, sum of magnitudes and count over ragged
+        (first, second) array pairs, in one pass.
+
+        Each pair is converted to complex into one preallocated scratch row
+        (real/imag, or magnitude/phase in degrees with the magnitude in dB
+        of the given unit or linear); entries with a non-finite part are
+        skipped.
+        """
+        length = max(len(first) for first, _ in pairs)
+        total = np.zeros(length, dtype=complex)
+        abs_total = np.zeros(length)
+        count = np.zeros(length, dtype=np.int64)
+        row = np.empty(length, dtype=complex)
+        magnitude = np.empty(length)
+        valid = np.empty(length, dtype=bool)
+
+        for first, second in pairs:
+            n = len(first)
+            z, mag, ok = row[:n], magnitude[:n], valid[:n]
+            if input_format == 'Real/Imag':
+                z.real = first
+                z.imag = second
+                np.abs(z, out=mag)
+            else:
+                if input_format == 'dB/Phase (deg)':
+                    _MathHelpers.lin_from_db(first, unit, out=mag)
+                else:
+                    np.abs(first, out=mag)
+                np.radians(second, out=z.real)
+                np.sin(z.real, out=z.imag)
+                np.cos(z.real, out=z.real)
+                z.real *= mag
+                z.imag *= mag
+            np.isfinite(z, out=ok)
+            np.add(total[:n], z, out=total[:n], where=ok)
+            np.add(abs_total[:n], mag, out=abs_total[:n], where=ok)
+            count[:n] += ok
+        return total, abs_total, count
+
     @staticmethod
     def average(arrs):
         with np.errstate(invalid='ignore', divide='ignore'):
             return np.nanmean(arrs, axis=0)
 
+class _RunningAverage:
+    """
+    Linear-domain running mean/variance over a set of named dB inputs.
+
+    Each input's linear row is kept together with the input array it came
+    from, so when one input is added, removed or modified only its
+    contribution is removed or added. The per-column mean and sum of
+    squared deviations (M2) are updated Welford-style, as in the importer's
+    ColumnStatistics, so the variance of tightly clustered traces keeps its
+    precision. A copy of every input is kept: Veusz edits dataset values
+    in place, so the document array itself is no evidence of a change.
+    Nothing is compared while the document changeset is unchanged;
+    otherwise inputs are checked by length, then value by value against
+    the copy. Only changed traces are converted, so the expensive part
+    of an update is O(changed traces). The moments are rebuilt from
+    scratch when most inputs change at once, and after REBUILD_AFTER
+    incremental changes so rounding errors cannot accumulate.
+    """
+
+    REBUILD_AFTER = 256
+
+    def __init__(self):
+        self.key = None
+        self.means = np.zeros(0)
+        self.m2 = np.zeros(0)
+        self.count = np.zeros(0, dtype=np.int64)
+        self.rows = {}
+        self.sources = {}
+        self.changeset = None
+        self.changes = 0
+
+    @staticmethod
+    def document_data(helper, name):
+        """
+        A 1D dataset's values as the document's own float array.
+
+        helper.getDataset() copies the data, and update() only needs a
+        copy of the inputs that changed. Anything but a numeric 1D dataset
+        goes through getDataset() for its error reporting.
+        """
+        dataset = getattr(helper, '_doc', None)
+        dataset = getattr(dataset, 'data', {}).get(name)
+        if (dataset is not None and getattr(dataset, 'dimensions', 1) == 1
+                and getattr(dataset, 'datatype', 'numeric') == 'numeric'):
+            data = dataset.data
+        else:
+            data = helper.getDataset(name, dimensions=1).data
+        return None if data is None else np.asarray(data, dtype=float)
+
+    @staticmethod
+    def document_changeset(helper):
+        """The document's change counter, or None if it has none."""
+        return getattr(getattr(helper, '_doc', None), 'changeset', None)
+
+    @staticmethod
+    def same_values(old, new):
+        """
+        Whether new holds the same values as old (float arrays or tuples
+        of them). Lengths are checked first, then the values bit for bit,
+        which matches NaNs without a separate isnan pass.
+        """
+        if isinstance(new, tuple):
+            return (isinstance(old, tuple) and len(old) == len(new)
+                    and all(map(_RunningAverage.same_values, old, new)))
+        return len(new) == len(old) and np.array_equal(
+            old.view(np.int64), new.view(np.int64))
+
+    @staticmethod
+    def snapshot(value):
+        """Private copy of an input (array or tuple of arrays)."""
+        if isinstance(value, tuple):
+            return tuple(np.array(arr) for arr in value)
+        return np.array(value)
+
+    @staticmethod
+    def fingerprint(value):
+        """Cheap identity of an array's (or tuple of arrays') contents."""
+        if isinstance(value, tuple):
+            return tuple(_RunningAverage.fingerprint(arr) for arr in value)
+        return len(value), zlib.crc32(np.ascontiguousarray(value))
+
+    def _add(self, row, sign):
+        """Add (sign=1) or remove (sign=-1) one linear row."""
+        n = len(row)
+        if n > len(self.means):
+            grow = n - len(self.means)
+            self.means = np.concatenate([self.means, np.zeros(grow)])
+            self.m2 = np.concatenate([self.m2, np.zeros(grow)])
+            self.count = np.concatenate(
+                [self.count, np.zeros(grow, dtype=np.int64)])
+        valid = np.isfinite(row)
+        mean = self.means[:n]
+        m2 = self.m2[:n]
+        count = self.count[:n]
+        count += sign * valid
+
+        # Welford update: the mean moves by delta/count, and M2 by the
+        # product of the deviations from the old and new means
+        delta = row - mean
+        step = np.zeros(n)
+        np.divide(delta, count, out=step, where=valid & (count > 0))
+        mean += sign * step
+        np.add(m2, sign * delta * (row - mean), out=m2, where=valid)
+        empty = count == 0
+        mean[empty] = 0.0
+        m2[empty] = 0.0
+        np.maximum(m2, 0.0, out=m2)
+
+    def update(self, inputs, convert=None, key=None, changeset=None):
+        """
+        Bring the sums in line with inputs, a dict of name -> dB array.
+
+        convert maps a list of input values to their linear rows and
+        defaults to _MathHelpers.linear_rows. key identifies anything else
+        the rows depend on (e.g. an interpolation grid); when it changes
+        every row is recomputed. changeset is the document change counter
+        (see document_changeset); while it stays the same the inputs are
+        taken as unchanged without comparing them.
+
+        Returns the number of inputs whose contribution changed.
+        """
+        convert = convert or _MathHelpers.linear_rows
+        if key != self.key:
+            self.key = key
+            self.rows = {}
+            self.sources = {}
+            self.changeset = None
+        elif (changeset is not None and changeset == self.changeset
+                and inputs.keys() == self.sources.keys()):
+            return 0
+        self.changeset = changeset
+
+        changed = [name for name, value in inputs.items()
+                   if name not in self.sources
+                   or not self.same_values(self.sources[name], value)]
+        removed = [name for name in self.sources if name not in inputs]
+        n_changes = len(changed) + len(removed)
+        if not n_changes:
+            return 0
+
+        if (2 * n_changes > len(inputs)
+                or self.changes + n_changes > self.REBUILD_AFTER):
+            names = list(inputs)
+            rows = convert([inputs[name] for name in names])
+            self.rows = dict(zip(names, rows))
+            self.means, self.m2, self.count = \
+                _MathHelpers.stack_moments(rows)
+            self.changes = 0
+        else:
+            for name in removed:
+                self._add(self.rows.pop(name), -1)
+            rows = convert([inputs[name] for name in changed]) \
+                if changed else []
+            for name, row in zip(changed, rows):
+                if name in self.rows:
+                    self._add(self.rows[name], -1)
+                self._add(row, 1)
+                self.rows[name] = row
+            self.changes += n_changes
+
+        for name in removed:
+            del self.sources[name]
+        for name in changed:
+            self.sources[name] = self.snapshot(inputs[name])
+        return n_changes
+
+    def aggregate(self, fields):
+        """
+        Aggregate the current rows as selected by the plugin fields.
+
+        Returns (center, low, high, err); low/high are only set for
+        percentile bands and err for a mean with error bars. Everything but
+        the mean needs the rows stacked.
+        """
+        method = fields.get('aggregation', 'Mean')
+        if method == 'Mean':
+            mean = self.mean()
+            count = self.count[:len(mean)]
+            return mean, None, None, _MathHelpers.error_scale(
+                self.std(), count, fields)
+
+        buf = _MathHelpers.rows_stack(list(self.rows.values()))
+        if method == 'Median':
+            return _MathHelpers.quantiles(buf, [0.5])[0], None, None, None
+        if method == 'Trimmed mean':
+            return _MathHelpers.trimmed_mean(
+                buf, fields.get('trim_fraction', 0.1)), None, None, None
+        if method == 'Sigma-clipped mean':
+            return _MathHelpers.sigma_clipped_mean(
+                buf, fields.get('clip_sigma', 3.0)), None, None, None
+        if method == 'Percentile bands':
+            low, center, high = _MathHelpers.quantiles(buf, PERCENTILE_BANDS)
+            return center, low, high, None
+        raise DatasetPluginException(f"Unknown aggregation '{method}'")
+
+    def mean(self):
+        """Current linear mean; NaN where no input has a valid value."""
+        length = max((len(row) for row in self.rows.values()), default=0)
+        mean = np.full(length, np.nan)
+        np.copyto(mean, self.means[:length], where=self.count[:length] > 0)
+        return mean
+
+    def std(self):
+        """Current sample std (ddof=1); NaN with fewer than two values."""
+        length = max((len(row) for row in self.rows.values()), default=0)
+        count = self.count[:length]
+        std = np.full(length, np.nan)
+        var = np.zeros(length)
+        np.divide(self.m2[:length], count - 1, out=var, where=count > 1)
+        np.sqrt(var, out=std, where=count > 1)
+        return std
+
+# Tag index per open document, dropped when the document goes away
+_TAG_INDEXES = weakref.WeakKeyDictionary()
+
+
+class _TagIndex:
+    """
+    Tag -> ordered dataset names for one document.
+
+    Nothing is scanned while the document's changeset counter is unchanged.
+    After a change only datasets that appeared, disappeared or were retagged
+    touch the index, and only their tags are read - the data never is.
+    Datasets with "freq" in the name are excluded as frequency axes.
+    """
+
+    def __init__(self):
+        self.changeset = None
+        self.tags = {}       # dataset name -> frozenset of tags
+        self.index = {}      # tag -> {dataset name: None}, insertion ordered
+        self.excluded = set()
+
+    @classmethod
+    def for_document(cls, doc):
+        """The index for doc, created on first use."""
+        tag_index = _TAG_INDEXES.get(doc)
+        if tag_index is None:
+            tag_index = _TAG_INDEXES[doc] = cls()
+        return tag_index
+
+    def _retag(self, name, tags):
+        old = self.tags.get(name, frozenset())
+        for tag in old - tags:
+            members = self.index[tag]
+            del members[name]
+            if not members:
+                del self.index[tag]
+        for tag in tags - old:
+            self.index.setdefault(tag, {})[name] = None
+        self.tags[name] = tags
+
+    def refresh(self, helper):
+        """
+        Bring the index up to date with the document.
+
+        Returns the names newly excluded as frequency datasets.
+        """
+        doc = helper._doc
+        changeset = getattr(doc, 'changeset', None)
+        if changeset is not None and changeset == self.changeset:
+            return []
+        self.changeset = changeset
+
+        names = helper.datasets1d
+        current = set(names)
+        for name in [name for name in self.tags if name not in current]:
+            self._retag(name, frozenset())
+            del self.tags[name]
+        self.excluded &= current
+
+        newly_excluded = []
+        for name in names:
+            if "freq" in name.lower():
+                if name not in self.excluded:
+                    self.excluded.add(name)
+                    newly_excluded.append(name)
+                continue
+            tags = frozenset(doc.data[name].tags)
+            if self.tags.get(name) != tags:
+                self._retag(name, tags)
+        return newly_excluded
+
+    def groups(self):
+        """Fresh {tag: [dataset names]} copy of the index."""
+        return {tag: list(members) for tag, members in self.index.items()}
+
 # %%% Processing by Tag
 # # ----------------------------------------------------------------------
 # # "PROCESS BY TAG"  - one result per tag
@@ -363,24 +1415,14 @@ class pluginUtilities(_ConsoleMixin, _MathHelpers, DatasetPlugin):
 
     def tagProcessing(self, helper, ):
         """Get all tags and create a dict with datasets as values."""
-        if not hasattr(self,'tag_map'):
-            self.tag_map = {}
-        for ds_name in helper.datasets1d:
-            if "freq" in ds_name.lower():
-                self._log(helper, f"[ByTag] excluded '{ds_name}'")
-            else:
-                # if it's not a frequency data container, process it
-                ds = helper.getDataset(ds_name, dimensions=1)
-                tags = helper._doc.data[ds_name].tags
+        tag_index = _TagIndex.for_document(helper._doc)
+        for ds_name in tag_index.refresh(helper):
+            self._log(helper, f"[ByTag] excluded '{ds_name}'")
 
-                # we have the tag, now we build a map where we  ave a dict of tags
-                # with the dataset names as values
-                for tag in tags:
-                    self.tag_map.setdefault(tag, []).append(ds_name)
-
-                if not self.tag_map:
-                    raise DatasetPluginException("No tagged datasets found.")
-        return self.tag_map
+        tag_map = tag_index.groups()
+        if not tag_map:
+            raise DatasetPluginException("No tagged datasets found.")
+        return tag_map
 
 class dBLinearAvgByTagPlugin(_ConsoleMixin, _MathHelpers, DatasetPlugin):
     # Plugin metadata
@@ -404,8 +1446,57 @@ class dBLinearAvgByTagPlugin(_ConsoleMixin, _MathHelpers, DatasetPlugin):
                             'meaningless_field',
                             'Just a Field, Everything is Automated.',
                             default='Meaningless'
-                            )
+                            ),
+            field.FieldCombo(
+                'unit',
+                'dB unit',
+                items=tuple(DB_UNITS),
+                editable=False,
+                default=DEFAULT_DB_UNIT
+            ),
+            field.FieldCombo(
+                'aggregation',
+                'Aggregation',
+                items=AGGREGATIONS,
+                editable=False,
+                default='Mean'
+            ),
+            field.FieldFloat(
+                'trim_fraction',
+                'Trimmed mean: fraction cut from each end',
+                default=0.1,
+                minval=0.0,
+                maxval=0.49
+            ),
+            field.FieldFloat(
+                'clip_sigma',
+                'Sigma-clipped mean: clip at N sigma',
+                default=3.0,
+                minval=0.1
+            ),
+            field.FieldCombo(
+                'error_bars',
+                'Error bars (mean aggregations)',
+                items=ERROR_BARS,
+                editable=False,
+                default='None'
+            ),
+            field.FieldFloat(
+                'confidence',
+                'Confidence level',
+                default=0.95,
+                minval=0.5,
+                maxval=0.9999
+            ),
+            field.FieldInt(
+                'workers',
+                'Worker threads (0 = auto)',
+                default=0,
+                minval=0
+            )
         ]
+        # One running linear sum/count per tag, kept between updates
+        self._tag_states = {}
 
 
     def getDatasets(self, fields):
@@ -417,25 +1508,68 @@ class dBLinearAvgByTagPlugin(_ConsoleMixin, _MathHelpers, DatasetPlugin):
         # Build tag map as an instance variable
         self.tag_map = pluginUtilities.tagProcessing(self, helper)
 
-        # Process each tag group
+        for tag in list(self._tag_states):
+            if tag not in self.tag_map:
+                del self._tag_states[tag]
+
+        # Fetch each tag group's data on the main thread
+        jobs = {}
         for tag, group in self.tag_map.items():
             try:
-                # self._handle_tag(helper, tag, group)
-                lin = [self.lin_from_db(ds.data) for ds in group if ds.data is not None]
-                N = max(map(len, lin))
-                avg_lin = self.average([self.pad(a, N) for a in lin])
-                avg_db = self.db_from_lin(avg_lin)
+                inputs = {}
+                for ds_name in group:
+                    data = _RunningAverage.document_data(helper, ds_name)
+                    if data is not None and len(data) > 0:
+                        inputs[ds_name] = data
+                if not inputs:
+                    raise DatasetPluginException("no data in tag group")
+            except Exception as exc:
+                self._log(helper, f"[ByTag] tag '{tag}' -> {exc}")
+                continue
+            self._tag_states.setdefault(tag, _RunningAverage())
+            jobs[tag] = inputs
+        changeset = _RunningAverage.document_changeset(helper)
+        if not jobs:
+            return
+
+        # Average the groups concurrently - the NumPy work releases the
+        # GIL - but create the output datasets here in sorted tag order
+        workers = fields.get('workers', 0) or min(
+            len(jobs), os.cpu_count() or 1, MAX_TAG_WORKERS)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                tag: pool.submit(self._average_tag, tag, inputs, fields,
+                                 changeset)
+                for tag, inputs in jobs.items()
+            }
+            for tag in sorted(futures):
+                try:
+                    lin_kw, db_kw = futures[tag].result()
+                except Exception as exc:
+                    self._log(helper, f"[ByTag] tag '{tag}' -> {exc}")
+                    continue
 
                 dBOut = helper.createDataset(f"{tag}_dB_avg", create_new=True)
-                dBOut.update(data=avg_db)
+                dBOut.update(**db_kw)
 
                 linOut = helper.createDataset(f"{tag}_lin_avg", create_new=True)
-                linOut.update(data=avg_lin)
+                linOut.update(**lin_kw)
 
                 self._log(helper, f"[ByTag] wrote '{tag}_dB_avg' & [ByTag] wrote '{tag}_lin_avg'")
-            except Exception as exc:
-                self._log(helper, f"[ByTag] tag '{tag}' -> {exc}")
 
+    def _average_tag(self, tag, inputs, fields, changeset=None):
+        """Linear and dB output values of one tag group; runs on a worker."""
+        unit = fields.get('unit', DEFAULT_DB_UNIT)
+        if fields.get('aggregation') == 'Log-sum-exp mean':
+            return self.logsumexp_outputs(
+                list(inputs.values()), unit, fields)
+
+        state = self._tag_states[tag]
+        state.update(
+            inputs,
+            convert=lambda values: self.linear_rows(values, unit),
+            key=unit, changeset=changeset)
+        return self.aggregate_outputs(*state.aggregate(fields), unit=unit)
 
 
 class dBToLinearByTagPlugin(_ConsoleMixin, _MathHelpers, DatasetPlugin):
@@ -614,3 +1748,4 @@ datasetpluginregistry.append(dBLinearAvgByTagPlugin)
 datasetpluginregistry.append(dBLinearAvgPlugin)
 datasetpluginregistry.append(LinearTodBPlugin)
 datasetpluginregistry.append(dBToLinearPlugin)
+datasetpluginregistry.append(VectorAvgPlugin)